@@ -1,25 +1,24 @@
 import os
+from collections.abc import Mapping
 from csv import DictWriter
-from datetime import datetime, timedelta
+from datetime import timedelta
 from io import BytesIO
 from zipfile import ZIP_DEFLATED, ZipFile
 from xml.sax.saxutils import escape
 
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import HTMLResponse, Response
-from sqlalchemy import MetaData, Table, literal, or_, select, text
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
+from sqlalchemy import case, func, or_, select, update
 from sqlalchemy.orm import Session
 
 from app.api.schemas import DeclineUpdate, StatusUpdate
-from app.core.config import ALLOW_ADMIN_DECLINE, CATERING_TEAM_EMAIL, TEST_MODE
-from app.core.logging import log_evt
+from app.core.clock import utcnow
+from app.core.config import ALLOW_ADMIN_DECLINE, REMINDER_DAY_1, REMINDER_DAY_2
 from app.core.security import require_admin, require_admin_request
 from app.db.models import EmailLog, Event, StatusChangeLog
-from app.db.session import engine, get_db
-from app.email.sender import send_email_logged
-from app.email.templates import render_offer_html
-from app.email.templates import reminder_email_body  # for manual send
-from app.services.offers import send_offer_flow
+from app.db.session import get_db
+from app.services.offers import resend_offer_task
+from app.services.reminders import send_manual_reminder_task
 from app.services.status_audit import log_status_change
 
 router = APIRouter()
@@ -41,6 +40,8 @@ def _xml_cell(value, cell_ref: str) -> str:
         return f'<c r="{cell_ref}" t="b"><v>{1 if value else 0}</v></c>'
     if isinstance(value, (int, float)) and not isinstance(value, bool):
         return f'<c r="{cell_ref}"><v>{value}</v></c>'
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
     safe = escape(str(value))
     return f'<c r="{cell_ref}" t="inlineStr"><is><t>{safe}</t></is></c>'
 
@@ -111,23 +112,14 @@ def _build_xlsx_bytes(fields: list[str], rows: list[dict]) -> bytes:
 
     return output.getvalue()
 
-def _event_datetime_to_iso(value):
-    if value is None:
-        return None
-    if hasattr(value, "isoformat"):
-        return value.isoformat()
-    return str(value)
-
-
 def _serialize_event(e):
-    get = e.get if isinstance(e, dict) else lambda k: getattr(e, k, None)
-    wedding_date = get("wedding_date")
+    get = e.get if isinstance(e, Mapping) else lambda k: getattr(e, k, None)
     return {
         "id": get("id"),
         "token": get("token"),
         "first_name": get("first_name"),
         "last_name": get("last_name"),
-        "wedding_date": str(wedding_date) if wedding_date else None,
+        "wedding_date": get("wedding_date"),
         "venue": get("venue"),
         "guest_count": get("guest_count"),
         "email": get("email"),
@@ -136,17 +128,57 @@ def _serialize_event(e):
         "status": get("status"),
         "accepted": bool(get("accepted")),
         "selected_package": get("selected_package"),
-        "created_at": _event_datetime_to_iso(get("created_at")),
-        "updated_at": _event_datetime_to_iso(get("updated_at")),
-        "last_email_sent_at": _event_datetime_to_iso(get("last_email_sent_at")),
+        "created_at": get("created_at"),
+        "updated_at": get("updated_at"),
+        "last_email_sent_at": get("last_email_sent_at"),
         "reminder_count": get("reminder_count") or 0,
-        "offer_sent_at": _event_datetime_to_iso(get("offer_sent_at")),
-        "reminder_3d_sent_at": _event_datetime_to_iso(get("reminder_3d_sent_at")),
-        "reminder_7d_sent_at": _event_datetime_to_iso(get("reminder_7d_sent_at")),
-        "event_2d_sent_at": _event_datetime_to_iso(get("event_2d_sent_at")),
+        "offer_sent_at": get("offer_sent_at"),
+        "reminder_3d_sent_at": get("reminder_3d_sent_at"),
+        "reminder_7d_sent_at": get("reminder_7d_sent_at"),
+        "event_2d_sent_at": get("event_2d_sent_at"),
+        "next_reminder_kind": get("next_reminder_kind"),
+        "next_reminder_due": _next_reminder_due(get, get("next_reminder_kind")),
     }
 
 
+_EVENT_LIST_FIELDS = (
+    "id", "token", "first_name", "last_name", "wedding_date", "venue", "guest_count",
+    "email", "phone", "message", "status", "accepted", "selected_package", "created_at",
+    "updated_at", "last_email_sent_at", "reminder_count", "offer_sent_at", "reminder_3d_sent_at",
+    "reminder_7d_sent_at", "event_2d_sent_at",
+)
+
+# Next reminder the hourly job would send, decided in SQL with the job's rules.
+_OFFER_BASE = func.coalesce(Event.offer_sent_at, Event.last_email_sent_at)
+_NEXT_REMINDER_KIND = case(
+    ((Event.status == "pending") & _OFFER_BASE.is_not(None) & Event.reminder_3d_sent_at.is_(None), "offer_3d"),
+    ((Event.status == "pending") & _OFFER_BASE.is_not(None) & Event.reminder_7d_sent_at.is_(None), "offer_7d"),
+    ((Event.status == "accepted") & Event.event_2d_sent_at.is_(None), "event_2d"),
+    else_=None,
+)
+
+# Mapped columns (additive migrations guarantee they exist), so no per-request reflection.
+_EVENT_LIST_COLUMNS = tuple(Event.__table__.c[name] for name in _EVENT_LIST_FIELDS) + (
+    _NEXT_REMINDER_KIND.label("next_reminder_kind"),
+    _OFFER_BASE.label("offer_base"),
+)
+
+_NEXT_REMINDER_OFFSET = {
+    "offer_3d": timedelta(days=REMINDER_DAY_1),
+    "offer_7d": timedelta(days=REMINDER_DAY_2),
+    "event_2d": timedelta(days=-2),
+}
+
+
+def _next_reminder_due(get, kind: str | None):
+    if kind is None:
+        return None
+    base = get("wedding_date") if kind == "event_2d" else get("offer_base")
+    if base is None:
+        return None
+    return base + _NEXT_REMINDER_OFFSET[kind]
+
+
 def _query_events_rows(
     db: Session,
     status: str | None = None,
@@ -154,53 +186,51 @@ def _query_events_rows(
     date_sort: str = "asc",
     id_sort: str | None = None,
     limit: int = 500,
+    offset: int = 0,
+    after: int | None = None,
 ):
-    metadata = MetaData()
-    events = Table("events", metadata, autoload_with=db.bind)
-
-    selected_fields = [
-        "id", "token", "first_name", "last_name", "wedding_date", "venue", "guest_count",
-        "email", "phone", "message", "status", "accepted", "selected_package", "created_at",
-        "updated_at", "last_email_sent_at", "reminder_count", "offer_sent_at", "reminder_3d_sent_at",
-        "reminder_7d_sent_at", "event_2d_sent_at",
-    ]
-
-    def col_or_null(name: str):
-        return events.c[name].label(name) if name in events.c else literal(None).label(name)
+    stmt = select(*_EVENT_LIST_COLUMNS)
 
-    stmt = select(*[col_or_null(name) for name in selected_fields]).select_from(events)
+    # Keyset cursor (id order only): seeks on the PK instead of scanning OFFSET rows.
+    if after is not None:
+        stmt = stmt.where(Event.id > after if id_sort == "asc" else Event.id < after)
 
-    if status and "status" in events.c:
-        stmt = stmt.where(events.c.status == status)
+    if status:
+        stmt = stmt.where(Event.status == status)
 
     if q and q.strip():
         qq = f"%{q.strip()}%"
-        terms = []
-        for name in ("first_name", "last_name", "email"):
-            if name in events.c:
-                terms.append(events.c[name].ilike(qq))
-        if terms:
-            stmt = stmt.where(or_(*terms))
-
-    if id_sort == "asc" and "id" in events.c:
-        stmt = stmt.order_by(events.c.id.asc())
-    elif id_sort == "desc" and "id" in events.c:
-        stmt = stmt.order_by(events.c.id.desc())
-    elif date_sort == "desc" and "wedding_date" in events.c and "id" in events.c:
-        stmt = stmt.order_by(events.c.wedding_date.desc(), events.c.id.desc())
-    elif "wedding_date" in events.c and "id" in events.c:
-        stmt = stmt.order_by(events.c.wedding_date.asc(), events.c.id.desc())
-
-    rows = db.execute(stmt.limit(limit)).mappings().all()
-    return [dict(r) for r in rows]
+        stmt = stmt.where(or_(Event.first_name.ilike(qq), Event.last_name.ilike(qq), Event.email.ilike(qq)))
+
+    if id_sort == "asc":
+        stmt = stmt.order_by(Event.id.asc())
+    elif id_sort == "desc":
+        stmt = stmt.order_by(Event.id.desc())
+    elif date_sort == "desc":
+        stmt = stmt.order_by(Event.wedding_date.desc(), Event.id.desc())
+    else:
+        stmt = stmt.order_by(Event.wedding_date.asc(), Event.id.desc())
+
+    return db.execute(stmt.limit(limit).offset(offset)).mappings().all()
+
+
+def _load_admin_html() -> bytes | None:
+    try:
+        with open(os.path.join("frontend", "admin.html"), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+# Read once at import; served as raw bytes (no stat/read/decode per request).
+_ADMIN_HTML = _load_admin_html()
 
 
 @router.get("/admin", response_class=HTMLResponse, include_in_schema=False)
 def admin_page(request: Request):
     require_admin_request(request)
-    path = os.path.join("frontend", "admin.html")
-    if os.path.isfile(path):
-        return HTMLResponse(open(path, "r", encoding="utf-8").read())
+    if _ADMIN_HTML is not None:
+        return HTMLResponse(_ADMIN_HTML)
     return HTMLResponse("<h2>admin.html not found</h2>", status_code=404)
 
 
@@ -211,23 +241,28 @@ def admin_logout():
 
 @router.get("/admin/api/events")
 def admin_events(
-    request: Request,
     status: str | None = None,
     q: str | None = None,
     date_sort: str = "asc",
     id_sort: str | None = None,
+    limit: int = Query(500, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    after: int | None = None,
     db: Session = Depends(get_db),
     _: None = Depends(require_admin),
 ):
-    require_admin_request(request)
-
-    rows = _query_events_rows(db, status=status, q=q, date_sort=date_sort, id_sort=id_sort, limit=500)
-    return {"items": [_serialize_event(e) for e in rows]}
+    if after is not None and id_sort not in {"asc", "desc"}:
+        raise HTTPException(status_code=400, detail="after requires id_sort=asc or id_sort=desc")
+    rows = _query_events_rows(
+        db, status=status, q=q, date_sort=date_sort, id_sort=id_sort, limit=limit, offset=offset, after=after
+    )
+    items = [_serialize_event(e) for e in rows]
+    next_cursor = items[-1]["id"] if id_sort in {"asc", "desc"} and len(items) == limit else None
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
 
 
 @router.get("/admin/api/events/export")
 def admin_events_export(
-    request: Request,
     status: str | None = None,
     q: str | None = None,
     date_sort: str = "asc",
@@ -235,8 +270,6 @@ def admin_events_export(
     db: Session = Depends(get_db),
     _: None = Depends(require_admin),
 ):
-    require_admin_request(request)
-
     rows = _query_events_rows(db, status=status, q=q, date_sort=date_sort, id_sort=id_sort, limit=500)
 
     fields = [
@@ -266,7 +299,7 @@ def admin_events_export(
     serialized_rows = [_serialize_event(e) for e in rows]
     xlsx_content = _build_xlsx_bytes(fields, serialized_rows)
 
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    timestamp = utcnow().strftime("%Y%m%d_%H%M%S")
     headers = {
         "Content-Disposition": f'attachment; filename="events_export_{timestamp}.xlsx"'
     }
@@ -277,70 +310,61 @@ def admin_events_export(
     )
 
 
+# Log views return exactly these columns, so rows are plain dicts (no ORM objects).
+_EMAIL_LOG_COLUMNS = (
+    EmailLog.id,
+    EmailLog.email_type,
+    EmailLog.to_email,
+    EmailLog.subject,
+    EmailLog.provider,
+    EmailLog.provider_message_id,
+    EmailLog.status,
+    EmailLog.error,
+    EmailLog.created_at,
+)
+_STATUS_LOG_COLUMNS = (
+    StatusChangeLog.id,
+    StatusChangeLog.old_status,
+    StatusChangeLog.new_status,
+    StatusChangeLog.source,
+    StatusChangeLog.reason,
+    StatusChangeLog.actor_ip,
+    StatusChangeLog.actor_user_agent,
+    StatusChangeLog.actor_auth,
+    StatusChangeLog.created_at,
+)
+
+
 @router.get("/admin/api/events/{event_id}/email-logs")
 def admin_email_logs(
     event_id: int,
-    request: Request,
     db: Session = Depends(get_db),
     _: None = Depends(require_admin),
 ):
-    require_admin_request(request)
-    rows = (
-        db.query(EmailLog)
-        .filter(EmailLog.event_id == event_id)
-        .order_by(EmailLog.id.desc())
-        .limit(200)
-        .all()
-    )
-    return {
-        "items": [
-            {
-                "id": r.id,
-                "email_type": r.email_type,
-                "to_email": r.to_email,
-                "subject": r.subject,
-                "provider": r.provider,
-                "provider_message_id": r.provider_message_id,
-                "status": r.status,
-                "error": r.error,
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-            }
-            for r in rows
-        ]
-    }
+    rows = db.execute(
+        select(*_EMAIL_LOG_COLUMNS).where(EmailLog.event_id == event_id).order_by(EmailLog.id.desc()).limit(200)
+    ).mappings()
+    return ORJSONResponse({"items": [dict(r) for r in rows]})
 
 
 @router.get("/admin/api/events/{event_id}/status-logs")
 def admin_status_logs(
     event_id: int,
-    request: Request,
     db: Session = Depends(get_db),
     _: None = Depends(require_admin),
 ):
-    require_admin_request(request)
-    rows = (
-        db.query(StatusChangeLog)
-        .filter(StatusChangeLog.event_id == event_id)
+    rows = db.execute(
+        select(*_STATUS_LOG_COLUMNS)
+        .where(StatusChangeLog.event_id == event_id)
         .order_by(StatusChangeLog.id.desc())
         .limit(200)
-        .all()
-    )
-    return {
-        "items": [
-            {
-                "id": r.id,
-                "old_status": r.old_status,
-                "new_status": r.new_status,
-                "source": r.source,
-                "reason": r.reason,
-                "actor_ip": r.actor_ip,
-                "actor_user_agent": r.actor_user_agent,
-                "actor_auth": r.actor_auth,
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-            }
-            for r in rows
-        ]
-    }
+    ).mappings()
+    return ORJSONResponse({"items": [dict(r) for r in rows]})
+
+
+# Status changes read only the prior status (for the audit row), not the whole event.
+_EVENT_STATUS_SQL = select(Event.status)
+_EVENT_EXISTS_SQL = select(Event.id)
 
 
 @router.post("/admin/api/events/{event_id}/status")
@@ -351,22 +375,19 @@ def admin_set_status(
     db: Session = Depends(get_db),
     _: None = Depends(require_admin),
 ):
-    require_admin_request(request)
-    e = db.query(Event).filter_by(id=event_id).first()
-    if not e:
+    row = db.execute(_EVENT_STATUS_SQL.where(Event.id == event_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Not found")
 
     # Guard rails: accepted/declined must use dedicated explicit endpoints.
     if payload.status in {"accepted", "declined"}:
         raise HTTPException(status_code=400, detail="Use dedicated accept/decline actions")
 
-    old_status = e.status
-    e.status = payload.status
+    values = {"status": payload.status, "updated_at": utcnow()}
     if payload.status == "pending":
-        e.accepted = False
-        e.selected_package = None
-    log_status_change(db, e, old_status, e.status, source="admin_status_api", request=request)
-    e.updated_at = datetime.utcnow()
+        values.update(accepted=False, selected_package=None)
+    db.execute(update(Event).where(Event.id == event_id).values(**values))
+    log_status_change(db, event_id, row.status, payload.status, source="admin_status_api", request=request)
     db.commit()
     return {"ok": True}
 
@@ -378,15 +399,13 @@ def admin_accept(
     db: Session = Depends(get_db),
     _: None = Depends(require_admin),
 ):
-    require_admin_request(request)
-    e = db.query(Event).filter_by(id=event_id).first()
-    if not e:
+    row = db.execute(_EVENT_STATUS_SQL.where(Event.id == event_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Not found")
-    old_status = e.status
-    e.accepted = True
-    e.status = "accepted"
-    log_status_change(db, e, old_status, e.status, source="admin_accept_api", request=request)
-    e.updated_at = datetime.utcnow()
+    db.execute(
+        update(Event).where(Event.id == event_id).values(accepted=True, status="accepted", updated_at=utcnow())
+    )
+    log_status_change(db, event_id, row.status, "accepted", source="admin_accept_api", request=request)
     db.commit()
     return {"ok": True}
 
@@ -399,26 +418,25 @@ def admin_decline(
     db: Session = Depends(get_db),
     _: None = Depends(require_admin),
 ):
-    require_admin_request(request)
     if not ALLOW_ADMIN_DECLINE:
         raise HTTPException(status_code=403, detail="Decline action is disabled")
 
-    e = db.query(Event).filter_by(id=event_id).first()
-    if not e:
+    row = db.execute(select(Event.status, Event.token).where(Event.id == event_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Not found")
 
     expected = f"DECLINE-{event_id}"
     if payload.confirm_text.strip().upper() != expected:
         raise HTTPException(status_code=400, detail=f"Decline confirmation must be {expected}")
-    if payload.event_token.strip() != (e.token or ""):
+    if payload.event_token.strip() != (row.token or ""):
         raise HTTPException(status_code=400, detail="Invalid event token")
 
-    old_status = e.status
-    e.accepted = False
-    e.status = "declined"
-    e.selected_package = None
-    log_status_change(db, e, old_status, e.status, source="admin_decline_api", request=request)
-    e.updated_at = datetime.utcnow()
+    db.execute(
+        update(Event)
+        .where(Event.id == event_id)
+        .values(accepted=False, status="declined", selected_package=None, updated_at=utcnow())
+    )
+    log_status_change(db, event_id, row.status, "declined", source="admin_decline_api", request=request)
     db.commit()
     return {"ok": True}
 
@@ -426,96 +444,29 @@ def admin_decline(
 @router.post("/admin/api/events/{event_id}/resend")
 def admin_resend_offer(
     event_id: int,
-    request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     _: None = Depends(require_admin),
 ):
     """Resend offer (admin action).
 
-    Idempotency: prevent duplicate sends from retries / double-clicks using:
-    - per-event Postgres advisory lock (best-effort)
-    - short-window dedupe via EmailLog
+    The send runs after the response; the lock/dedupe guards live in resend_offer_flow.
     """
-    require_admin_request(request)
-    e = db.query(Event).filter_by(id=event_id).first()
-    if not e:
+    if db.execute(_EVENT_EXISTS_SQL.where(Event.id == event_id)).first() is None:
         raise HTTPException(status_code=404, detail="Not found")
-
-    # Best-effort per-event lock (Postgres only). If not acquired, skip quietly.
-    lock_acquired = False
-    if not ("sqlite" in str(engine.url)):
-        try:
-            lock_key = 900000 + int(event_id)
-            lock_acquired = bool(db.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": lock_key}).scalar())
-            if not lock_acquired:
-                log_evt("info", "resend_skipped", event_id=event_id, email_type="resend_offer", reason="lock_not_acquired")
-                return {"ok": True, "skipped": True}
-        except Exception:
-            # safer to skip than to risk duplicate sends
-            log_evt("error", "resend_skipped", event_id=event_id, email_type="resend_offer", reason="lock_error")
-            return {"ok": True, "skipped": True}
-
-    try:
-        # Short-window dedupe (60s)
-        cutoff = datetime.utcnow() - timedelta(seconds=60)
-        recent = (
-            db.query(EmailLog)
-            .filter(EmailLog.event_id == event_id, EmailLog.email_type == "resend_offer", EmailLog.created_at >= cutoff)
-            .first()
-        )
-        if recent:
-            log_evt("info", "resend_skipped", event_id=event_id, email_type="resend_offer", reason="recent_dedupe")
-            return {"ok": True, "skipped": True}
-
-        # Send without touching offer_sent_at; this is an explicit resend.
-        offer_recipient = CATERING_TEAM_EMAIL if TEST_MODE else e.email
-        subject_offer = f"Ponuda – {e.first_name} {e.last_name}{' (TEST)' if TEST_MODE else ''}"
-        body_offer = render_offer_html(e)
-        send_email_logged(db, e.id, "resend_offer", offer_recipient, subject_offer, body_offer)
-
-        now = datetime.utcnow()
-        e.last_email_sent_at = now
-        e.updated_at = now
-        db.commit()
-
-        log_evt("info", "resend_sent", event_id=event_id, email_type="resend_offer", recipient=offer_recipient)
-        return {"ok": True}
-
-    finally:
-        if lock_acquired and not ("sqlite" in str(engine.url)):
-            try:
-                db.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": 900000 + int(event_id)})
-                db.commit()
-            except Exception:
-                pass
+    background_tasks.add_task(resend_offer_task, event_id)
+    return {"ok": True, "queued": True}
 
 
 @router.post("/admin/api/events/{event_id}/send-reminder-now")
 def admin_send_reminder_now(
     event_id: int,
-    request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     _: None = Depends(require_admin),
 ):
-    """Manual reminder send (admin action)."""
-    require_admin_request(request)
-    e = db.query(Event).filter_by(id=event_id).first()
-    if not e:
+    """Manual reminder send (admin action), queued to run after the response."""
+    if db.execute(_EVENT_EXISTS_SQL.where(Event.id == event_id)).first() is None:
         raise HTTPException(status_code=404, detail="Not found")
-
-    offer_recipient = CATERING_TEAM_EMAIL if TEST_MODE else e.email
-    send_email_logged(
-        db,
-        e.id,
-        "manual_reminder",
-        offer_recipient,
-        "Podsjetnik — Landsky ponuda",
-        reminder_email_body(e),
-    )
-
-    now = datetime.utcnow()
-    e.last_email_sent_at = now
-    e.updated_at = now
-    db.commit()
-    log_evt("info", "manual_reminder_sent", event_id=event_id, email_type="manual_reminder", recipient=offer_recipient)
-    return {"ok": True}
+    background_tasks.add_task(send_manual_reminder_task, event_id)
+    return {"ok": True, "queued": True}
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, Request
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from app.core.config import REMINDERS_ENABLED
+from app.core.config import OFFER_REDRIVE_ENABLED, REMINDERS_ENABLED
 from app.db.session import get_db
 
 router = APIRouter()
@@ -26,6 +26,7 @@ def health(request: Request, db: Session = Depends(get_db)):
         "db": "ok" if db_ok else "error",
         "scheduler": {
             "enabled": bool(REMINDERS_ENABLED),
+            "offer_redrive": bool(OFFER_REDRIVE_ENABLED),
             "running": sched_running,
         },
     }
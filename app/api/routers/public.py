@@ -1,96 +1,111 @@
+import hashlib
 import html
-import uuid
-from datetime import datetime
-
-from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+import re
+import secrets
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.orm import Session, raiseload
 
 from app.api.schemas import RegistrationRequest
+from app.core.clock import utcnow
 from app.core.config import BASE_URL, TEST_MODE
-from app.core.logging import logger
 from app.db.models import Event
 from app.db.session import get_db
 from app.email.templates import PACKAGE_LABELS, render_offer_html
-from app.services.offers import send_offer_flow
+from app.services.offers import send_offer_task
 from app.services.status_audit import log_status_change
 
 router = APIRouter()
 
+# Shape of any token we issue (URL-safe base64, or uuid4 hex on older rows); anything else is
+# rejected before touching the DB (scanners, truncated links).
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_-]{16,64}")
+
+# Token lookups built once; SQLAlchemy reuses their compiled SQL on every click.
+_ID_BY_TOKEN = select(Event.id).where(Event.token == bindparam("token"))
+_STATE_BY_TOKEN = select(Event.status, Event.selected_package).where(Event.token == bindparam("token"))
+_PREVIEW_BY_TOKEN = select(Event.updated_at, Event.offer_html).where(Event.token == bindparam("token"))
+_EVENT_BY_TOKEN = select(Event).options(raiseload("*")).where(Event.token == bindparam("token"))
+
+# Guest accept: only a still-pending event can move to accepted.
+_ACCEPT_SQL = text(
+    "UPDATE events SET accepted=:accepted, status='accepted', selected_package=:p, updated_at=:now "
+    "WHERE token=:token AND status='pending' RETURNING id"
+)
+
+# Guest decline: one round-trip on the normal path (no-op if already declined).
+_DECLINE_SQL = text(
+    "UPDATE events SET accepted=:accepted, status='declined', updated_at=:now "
+    "WHERE token=:token AND status<>'declined'"
+)
+
+# Fixed response bodies, encoded once.
+_HTML_BAD_TOKEN = "<h3>Neispravan token.</h3>".encode("utf-8")
+_HTML_BAD_PACKAGE = "<h3>Neispravan paket.</h3>".encode("utf-8")
+_HTML_ALREADY_DECLINED = "<h3>Ponuda je već odbijena.</h3>".encode("utf-8")
+_HTML_DECLINED = "<h2>Ponuda odbijena.</h2><p>Hvala na povratnoj informaciji.</p>".encode("utf-8")
+_HTML_DECLINE_INFO = """
+        <div style='font-family:Arial,sans-serif;max-width:720px;margin:30px auto;'>
+          <h2>Odbijanje ponude</h2>
+          <p>
+            Radi sigurnosti, odbijanje ponude više nije moguće putem email linka.
+          </p>
+          <p>
+            Molimo odgovorite na email i napišite da želite odbiti ponudu,
+            a naš tim će ručno ažurirati status.
+          </p>
+        </div>
+        """.encode("utf-8")
+
+_PACKAGE_LABELS_ESCAPED = {key: html.escape(label) for key, label in PACKAGE_LABELS.items()}
+
+# (package key, card style, blurb) for the /accept package selection page
+_PACKAGE_CARDS = (
+    (
+        "classic",
+        "border:1px solid #eee;border-radius:14px;padding:16px;margin-bottom:14px;background:#fafafa;",
+        "Osnovna ponuda — idealno za kratka događanja i većim brojem uzvanika.",
+    ),
+    (
+        "premium",
+        "border:1px solid #ffe8c2;border-radius:14px;padding:16px;margin-bottom:14px;background:#fff7ea;",
+        "Proširena ponuda — elegantnija i ekskluzivnija događanja.",
+    ),
+    (
+        "signature",
+        "border:1px solid #e8e8ff;border-radius:14px;padding:16px;background:#f5f5ff;",
+        "Premium experience — potpuni wow efekt.",
+    ),
+)
+
+
+def _package_card_html(key: str, card_style: str, blurb: str) -> str:
+    label = _PACKAGE_LABELS_ESCAPED[key]
+    return f"""        <!-- {label} -->
+        <div style="{card_style}">
+          <div style="font-weight:700;">{label}</div>
+          <div style="font-size:13px;color:#666;margin-top:4px;">
+            {blurb}
+          </div>
+          <div style="margin-top:10px;">
+            <form method="post" action="{BASE_URL}/accept/confirm">
+              <input type="hidden" name="token" value="{{token}}">
+              <input type="hidden" name="package" value="{key}">
+              <button type="submit" style="background:#1b5e20;color:#fff;text-decoration:none;padding:8px 14px;border-radius:8px;font-weight:700;display:inline-block;border:0;cursor:pointer;">
+                Odaberi {label}
+              </button>
+            </form>
+          </div>
+        </div>"""
 
-@router.get("/", include_in_schema=False)
-def root():
-    return RedirectResponse(url="/frontend/")
-
-
-@router.post("/register")
-def register(payload: RegistrationRequest, db: Session = Depends(get_db)):
-    e = Event(
-        token=uuid.uuid4().hex,
-        first_name=payload.first_name.strip(),
-        last_name=payload.last_name.strip(),
-        wedding_date=payload.wedding_date,
-        venue=payload.venue.strip(),
-        guest_count=payload.guest_count,
-        email=str(payload.email),
-        phone=payload.phone.strip(),
-        message=(payload.message or "").strip() or None,
-        status="pending",
-        accepted=False,
-        selected_package=None,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
-        last_email_sent_at=None,
-        reminder_count=0,
-    )
-
-    db.add(e)
-    db.commit()
-    db.refresh(e)
-
-    preview_url = f"{BASE_URL}/offer-preview?token={e.token}" if TEST_MODE else None
-
-    try:
-        send_offer_flow(e, db=db)
-    except Exception:
-        logger.exception("EMAIL SEND FAILED")
-
-    return {"message": "Vaš upit je zaprimljen.", "preview_url": preview_url}
-
-
-@router.get("/offer-preview", response_class=HTMLResponse)
-def offer_preview(token: str = Query(...), db: Session = Depends(get_db)):
-    e = db.query(Event).filter_by(token=token).first()
-    if not e:
-        raise HTTPException(status_code=404, detail="Token not found")
-    return HTMLResponse(render_offer_html(e))
-
-
-@router.get("/accept", response_class=HTMLResponse)
-def accept_get(
-    request: Request,
-    token: str = Query(...),
-    db: Session = Depends(get_db),
-):
-    e = db.query(Event).filter_by(token=token).first()
-    if not e:
-        return HTMLResponse("<h3>Neispravan token.</h3>", status_code=404)
-
-    if e.status == "accepted":
-        chosen = PACKAGE_LABELS.get((e.selected_package or "").lower(), e.selected_package or "—")
-        return HTMLResponse(
-            f"<h3>Ponuda je već prihvaćena.</h3><p>Odabrani paket: <b>{html.escape(chosen)}</b></p>"
-        )
-
-    if e.status == "declined":
-        return HTMLResponse("<h3>Ponuda je već odbijena.</h3>")
 
-    # Show selection UI (selection is confirmed via POST form submit)
-    logo_url = f"{BASE_URL}/frontend/logo.png"
+_ACCEPT_FORM_CARDS = "\n\n".join(
+    _package_card_html(key, card_style, blurb) for key, card_style, blurb in _PACKAGE_CARDS
+)
 
-    return HTMLResponse(
-        f"""
+# /accept package selection page, built once; only {token} is filled in per request.
+_ACCEPT_FORM_TEMPLATE = f"""
 <!doctype html>
 <html>
 <head>
@@ -106,7 +121,7 @@ def accept_get(
       <table role="presentation" width="100%" cellpadding="0" cellspacing="0" style="background:#221E27;">
         <tr>
           <td width="110" align="left" style="padding:18px;">
-            <img src="{logo_url}" width="74" height="74"
+            <img src="{BASE_URL}/frontend/logo.png" width="74" height="74"
               alt="Landsky Cocktail Catering"
               style="display:block;width:74px;height:74px;object-fit:contain;border-radius:14px;background:#ffffff;padding:8px;border:0;">
           </td>
@@ -128,56 +143,7 @@ def accept_get(
           Molimo odaberite jedan od paketa za potvrdu ponude.
         </div>
 
-        <!-- Classic -->
-        <div style="border:1px solid #eee;border-radius:14px;padding:16px;margin-bottom:14px;background:#fafafa;">
-          <div style="font-weight:700;">Classic</div>
-          <div style="font-size:13px;color:#666;margin-top:4px;">
-            Osnovna ponuda — idealno za kratka događanja i većim brojem uzvanika.
-          </div>
-          <div style="margin-top:10px;">
-            <form method="post" action="{BASE_URL}/accept/confirm">
-              <input type="hidden" name="token" value="{e.token}">
-              <input type="hidden" name="package" value="classic">
-              <button type="submit" style="background:#1b5e20;color:#fff;text-decoration:none;padding:8px 14px;border-radius:8px;font-weight:700;display:inline-block;border:0;cursor:pointer;">
-                Odaberi Classic
-              </button>
-            </form>
-          </div>
-        </div>
-
-        <!-- Premium -->
-        <div style="border:1px solid #ffe8c2;border-radius:14px;padding:16px;margin-bottom:14px;background:#fff7ea;">
-          <div style="font-weight:700;">Premium</div>
-          <div style="font-size:13px;color:#666;margin-top:4px;">
-            Proširena ponuda — elegantnija i ekskluzivnija događanja.
-          </div>
-          <div style="margin-top:10px;">
-            <form method="post" action="{BASE_URL}/accept/confirm">
-              <input type="hidden" name="token" value="{e.token}">
-              <input type="hidden" name="package" value="premium">
-              <button type="submit" style="background:#1b5e20;color:#fff;text-decoration:none;padding:8px 14px;border-radius:8px;font-weight:700;display:inline-block;border:0;cursor:pointer;">
-                Odaberi Premium
-              </button>
-            </form>
-          </div>
-        </div>
-
-        <!-- Signature -->
-        <div style="border:1px solid #e8e8ff;border-radius:14px;padding:16px;background:#f5f5ff;">
-          <div style="font-weight:700;">Signature</div>
-          <div style="font-size:13px;color:#666;margin-top:4px;">
-            Premium experience — potpuni wow efekt.
-          </div>
-          <div style="margin-top:10px;">
-            <form method="post" action="{BASE_URL}/accept/confirm">
-              <input type="hidden" name="token" value="{e.token}">
-              <input type="hidden" name="package" value="signature">
-              <button type="submit" style="background:#1b5e20;color:#fff;text-decoration:none;padding:8px 14px;border-radius:8px;font-weight:700;display:inline-block;border:0;cursor:pointer;">
-                Odaberi Signature
-              </button>
-            </form>
-          </div>
-        </div>
+{_ACCEPT_FORM_CARDS}
 
         <div style="margin-top:20px;font-size:12px;color:#777;text-align:center;">
           Ako trebate pomoć, kontaktirajte
@@ -191,9 +157,92 @@ def accept_get(
   </div>
 </body>
 </html>
-        """
+"""
+
+
+@router.get("/", include_in_schema=False)
+def root():
+    return RedirectResponse(url="/frontend/")
+
+
+@router.post("/register")
+def register(payload: RegistrationRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    now = utcnow()
+    e = Event(
+        token=secrets.token_urlsafe(16),
+        first_name=payload.first_name.strip(),
+        last_name=payload.last_name.strip(),
+        wedding_date=payload.wedding_date,
+        venue=payload.venue.strip(),
+        guest_count=payload.guest_count,
+        email=str(payload.email),
+        phone=payload.phone.strip(),
+        message=(payload.message or "").strip() or None,
+        status="pending",
+        accepted=False,
+        selected_package=None,
+        created_at=now,
+        updated_at=now,
+        last_email_sent_at=None,
+        reminder_count=0,
     )
 
+    db.add(e)
+    db.commit()
+    db.refresh(e)
+
+    preview_url = f"{BASE_URL}/offer-preview?token={e.token}" if TEST_MODE else None
+
+    # Emails go out after the response is sent; offer_sent_at stays NULL until they do.
+    background_tasks.add_task(send_offer_task, e.id)
+
+    return {"message": "Vaš upit je zaprimljen.", "preview_url": preview_url}
+
+
+@router.get("/offer-preview", response_class=HTMLResponse)
+def offer_preview(request: Request, token: str = Query(...), db: Session = Depends(get_db)):
+    if not _TOKEN_RE.fullmatch(token):
+        raise HTTPException(status_code=404, detail="Token not found")
+    row = db.execute(_PREVIEW_BY_TOKEN, {"token": token}).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Token not found")
+
+    # The offer only changes when the event row does, so updated_at versions it.
+    etag = '"' + hashlib.sha1(f"{token}:{row.updated_at}".encode("utf-8")).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    if row.offer_html:
+        return HTMLResponse(row.offer_html, headers=headers)
+    e = db.execute(_EVENT_BY_TOKEN, {"token": token}).scalar_one()
+    return HTMLResponse(render_offer_html(e), headers=headers)
+
+
+@router.get("/accept", response_class=HTMLResponse)
+def accept_get(
+    request: Request,
+    token: str = Query(...),
+    db: Session = Depends(get_db),
+):
+    if not _TOKEN_RE.fullmatch(token):
+        return HTMLResponse(_HTML_BAD_TOKEN, status_code=404)
+    e = db.execute(_STATE_BY_TOKEN, {"token": token}).first()
+    if not e:
+        return HTMLResponse(_HTML_BAD_TOKEN, status_code=404)
+
+    if e.status == "accepted":
+        chosen = _PACKAGE_LABELS_ESCAPED.get((e.selected_package or "").lower()) or html.escape(e.selected_package or "—")
+        return HTMLResponse(
+            f"<h3>Ponuda je već prihvaćena.</h3><p>Odabrani paket: <b>{chosen}</b></p>"
+        )
+
+    if e.status == "declined":
+        return HTMLResponse(_HTML_ALREADY_DECLINED)
+
+    # Selection is confirmed via POST form submit; the token is the only per-request part.
+    return HTMLResponse(_ACCEPT_FORM_TEMPLATE.format_map({"token": token}))
+
 
 @router.post("/accept/confirm", response_class=HTMLResponse)
 def accept_confirm_post(
@@ -202,36 +251,32 @@ def accept_confirm_post(
     package: str = Form(...),
     db: Session = Depends(get_db),
 ):
-    e = db.query(Event).filter_by(token=token).first()
-    if not e:
-        return HTMLResponse("<h3>Neispravan token.</h3>", status_code=404)
-
+    if not _TOKEN_RE.fullmatch(token):
+        return HTMLResponse(_HTML_BAD_TOKEN, status_code=404)
     p = package.strip().lower()
     if p not in PACKAGE_LABELS:
-        return HTMLResponse("<h3>Neispravan paket.</h3>", status_code=400)
-
-    now = datetime.utcnow()
-    res = db.execute(
-        text(
-            "UPDATE events SET accepted=:accepted, status='accepted', selected_package=:p, updated_at=:now "
-            "WHERE id=:id AND status='pending'"
-        ),
-        {"p": p, "now": now, "id": e.id, "accepted": True},
-    )
-    db.commit()
-
-    if res.rowcount == 1:
-        db.refresh(e)
-        log_status_change(db, e, "pending", "accepted", source="guest_accept_post", request=request)
+        if db.execute(_ID_BY_TOKEN, {"token": token}).first() is None:
+            return HTMLResponse(_HTML_BAD_TOKEN, status_code=404)
+        return HTMLResponse(_HTML_BAD_PACKAGE, status_code=400)
+
+    # One round-trip on the normal path: the guarded UPDATE also resolves the token.
+    accepted = db.execute(_ACCEPT_SQL, {"p": p, "now": utcnow(), "token": token, "accepted": True}).first()
+    if accepted:
+        log_status_change(db, accepted.id, "pending", "accepted", source="guest_accept_post", request=request)
         db.commit()
+        selected = p
     else:
-        db.refresh(e)
-        if e.status == "declined":
-            return HTMLResponse("<h3>Ponuda je već odbijena.</h3>")
-
-    chosen = PACKAGE_LABELS.get((e.selected_package or p), e.selected_package or p)
+        db.rollback()
+        current = db.execute(_STATE_BY_TOKEN, {"token": token}).first()
+        if current is None:
+            return HTMLResponse(_HTML_BAD_TOKEN, status_code=404)
+        if current.status == "declined":
+            return HTMLResponse(_HTML_ALREADY_DECLINED)
+        selected = current.selected_package or p
+
+    chosen = _PACKAGE_LABELS_ESCAPED.get(selected) or html.escape(selected)
     return HTMLResponse(
-        f"<h2>Hvala! Ponuda je prihvaćena.</h2><p>Odabrani paket: <b>{html.escape(chosen)}</b></p>"
+        f"<h2>Hvala! Ponuda je prihvaćena.</h2><p>Odabrani paket: <b>{chosen}</b></p>"
     )
 
 
@@ -240,24 +285,10 @@ def decline_get(
     token: str = Query(...),
     db: Session = Depends(get_db),
 ):
-    e = db.query(Event).filter_by(token=token).first()
-    if not e:
-        return HTMLResponse("<h3>Neispravan token.</h3>", status_code=404)
+    if not _TOKEN_RE.fullmatch(token) or db.execute(_ID_BY_TOKEN, {"token": token}).first() is None:
+        return HTMLResponse(_HTML_BAD_TOKEN, status_code=404)
 
-    return HTMLResponse(
-        """
-        <div style='font-family:Arial,sans-serif;max-width:720px;margin:30px auto;'>
-          <h2>Odbijanje ponude</h2>
-          <p>
-            Radi sigurnosti, odbijanje ponude više nije moguće putem email linka.
-          </p>
-          <p>
-            Molimo odgovorite na email i napišite da želite odbiti ponudu,
-            a naš tim će ručno ažurirati status.
-          </p>
-        </div>
-        """
-    )
+    return HTMLResponse(_HTML_DECLINE_INFO)
 
 
 @router.post("/decline/confirm", response_class=HTMLResponse)
@@ -265,15 +296,13 @@ def decline_confirm_post(
     token: str = Form(...),
     db: Session = Depends(get_db),
 ):
-    e = db.query(Event).filter_by(token=token).first()
-    if not e:
-        return HTMLResponse("<h3>Neispravan token.</h3>", status_code=404)
-
-    if e.status == "declined":
-        return HTMLResponse("<h3>Ponuda je već odbijena.</h3>")
-
-    e.accepted = False
-    e.status = "declined"
-    e.updated_at = datetime.utcnow()
+    if not _TOKEN_RE.fullmatch(token):
+        return HTMLResponse(_HTML_BAD_TOKEN, status_code=404)
+    res = db.execute(_DECLINE_SQL, {"token": token, "now": utcnow(), "accepted": False})
     db.commit()
-    return HTMLResponse("<h2>Ponuda odbijena.</h2><p>Hvala na povratnoj informaciji.</p>")
+    if res.rowcount == 1:
+        return HTMLResponse(_HTML_DECLINED)
+
+    if db.execute(_ID_BY_TOKEN, {"token": token}).first() is None:
+        return HTMLResponse(_HTML_BAD_TOKEN, status_code=404)
+    return HTMLResponse(_HTML_ALREADY_DECLINED)
@@ -1,5 +1,5 @@
 from datetime import date
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, EmailStr, Field
 
@@ -16,7 +16,7 @@ class RegistrationRequest(BaseModel):
 
 
 class StatusUpdate(BaseModel):
-    status: str
+    status: Literal["pending", "accepted", "declined"]
 
 
 class DeclineUpdate(BaseModel):
@@ -35,6 +35,12 @@ REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "0").lower() in ("1", "true",
 REMINDER_DAY_1 = int(os.getenv("REMINDER_DAY_1", "3"))
 REMINDER_DAY_2 = int(os.getenv("REMINDER_DAY_2", "7"))
 
+# Scheduled retry of offer emails that failed or were lost mid-send (independent of reminders)
+OFFER_REDRIVE_ENABLED = os.getenv("OFFER_REDRIVE_ENABLED", "1").lower() in ("1", "true", "yes", "on")
+
+# Schema create_all + additive migrations at app startup (disable when run per deploy)
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "1").lower() in ("1", "true", "yes", "on")
+
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
 ALLOW_ADMIN_DECLINE = os.getenv("ALLOW_ADMIN_DECLINE", "0").lower() in ("1", "true", "yes", "on")
@@ -1,4 +1,5 @@
 import base64
+import hmac
 
 from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
@@ -7,9 +8,14 @@ from .config import ADMIN_PASSWORD, ADMIN_USER
 
 security = HTTPBasic()
 
+# Compared as one "user:password" blob in constant time (no early exit on mismatch).
+_ADMIN_EXPECTED = f"{ADMIN_USER}:{ADMIN_PASSWORD}".encode("utf-8")
+_ADMIN_CREDENTIALS = base64.b64encode(_ADMIN_EXPECTED)
+
 
 def require_admin(credentials: HTTPBasicCredentials = Depends(security)):
-    if credentials.username != ADMIN_USER or credentials.password != ADMIN_PASSWORD:
+    supplied = f"{credentials.username}:{credentials.password}".encode("utf-8")
+    if not hmac.compare_digest(supplied, _ADMIN_EXPECTED):
         raise HTTPException(
             status_code=401,
             detail="Unauthorized",
@@ -18,15 +24,12 @@ def require_admin(credentials: HTTPBasicCredentials = Depends(security)):
 
 
 def _check_basic_auth(request: Request) -> bool:
-    auth = request.headers.get("Authorization", "")
-    if not auth.startswith("Basic "):
-        return False
-    try:
-        decoded = base64.b64decode(auth.split(" ", 1)[1]).decode("utf-8")
-        username, password = decoded.split(":", 1)
-    except Exception:
+    # Compare the encoded credentials against the precomputed value: no base64/utf-8
+    # decode per request. The scheme is case-insensitive (RFC 7235), as in HTTPBasic.
+    scheme, _, credentials = request.headers.get("Authorization", "").strip().partition(" ")
+    if scheme.lower() != "basic":
         return False
-    return username == ADMIN_USER and password == ADMIN_PASSWORD
+    return hmac.compare_digest(credentials.strip().encode("utf-8"), _ADMIN_CREDENTIALS)
 
 
 def require_admin_request(request: Request) -> None:
@@ -8,7 +8,7 @@ def run_additive_migrations(engine: Engine) -> None:
     """Best-effort, additive-only migrations for MVP deployment."""
     try:
         with engine.begin() as conn:
-            if "sqlite" in str(engine.url):
+            if engine.dialect.name == "sqlite":
                 cols = conn.execute(text("PRAGMA table_info(events);")).fetchall()
                 names = [c[1] for c in cols]
 
@@ -27,16 +27,17 @@ def run_additive_migrations(engine: Engine) -> None:
                 add_sqlite("reminder_3d_sent_at", "ALTER TABLE events ADD COLUMN reminder_3d_sent_at DATETIME")
                 add_sqlite("reminder_7d_sent_at", "ALTER TABLE events ADD COLUMN reminder_7d_sent_at DATETIME")
                 add_sqlite("event_2d_sent_at", "ALTER TABLE events ADD COLUMN event_2d_sent_at DATETIME")
+                add_sqlite("offer_html", "ALTER TABLE events ADD COLUMN offer_html TEXT")
             else:
+                # One catalog round-trip for all columns instead of one per check.
+                existing = set(
+                    conn.execute(
+                        text("SELECT column_name FROM information_schema.columns WHERE table_name='events'")
+                    ).scalars()
+                )
+
                 def col_exists(col: str) -> bool:
-                    r = conn.execute(
-                        text(
-                            "SELECT column_name FROM information_schema.columns "
-                            "WHERE table_name='events' AND column_name=:c"
-                        ),
-                        {"c": col},
-                    ).fetchone()
-                    return bool(r)
+                    return col in existing
 
                 if not col_exists("message"):
                     conn.execute(text("ALTER TABLE events ADD COLUMN message TEXT"))
@@ -58,5 +59,33 @@ def run_additive_migrations(engine: Engine) -> None:
                     conn.execute(text("ALTER TABLE events ADD COLUMN reminder_7d_sent_at TIMESTAMP NULL"))
                 if not col_exists("event_2d_sent_at"):
                     conn.execute(text("ALTER TABLE events ADD COLUMN event_2d_sent_at TIMESTAMP NULL"))
+                if not col_exists("offer_html"):
+                    conn.execute(text("ALTER TABLE events ADD COLUMN offer_html TEXT"))
+
+            # Indexes (create_all only adds them for brand-new tables)
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_status_id ON events (status, id)"))
+            conn.execute(
+                text("CREATE INDEX IF NOT EXISTS ix_events_status_wedding_date ON events (status, wedding_date)")
+            )
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_wedding_date ON events (wedding_date)"))
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_events_status_offer_base "
+                    "ON events (status, COALESCE(offer_sent_at, last_email_sent_at))"
+                )
+            )
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_email_logs_event_id_id ON email_logs (event_id, id)"))
+            conn.execute(
+                text("CREATE INDEX IF NOT EXISTS ix_status_change_logs_event_id_id ON status_change_logs (event_id, id)")
+            )
     except Exception:
         logger.exception("MIGRATIONS skipped/failed")
+
+
+if __name__ == "__main__":
+    # Run once per deploy: `python -m app.db.migrations` (then set RUN_MIGRATIONS_ON_STARTUP=0).
+    from app.db.models import Base
+    from app.db.session import engine
+
+    Base.metadata.create_all(bind=engine)
+    run_additive_migrations(engine)
@@ -1,20 +1,29 @@
-from datetime import datetime
+import html
+from functools import cached_property
 
-from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import declarative_base
 
+from app.core.clock import utcnow
+
 Base = declarative_base()
 
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Admin list filtered by status, ordered by id.
+        Index("ix_events_status_id", "status", "id"),
+        # event_2d reminder scan: accepted + wedding_date cutoff.
+        Index("ix_events_status_wedding_date", "status", "wedding_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String(64), unique=True, index=True, nullable=False)
 
     first_name = Column(String(120), nullable=False)
     last_name = Column(String(120), nullable=False)
-    wedding_date = Column(Date, nullable=False)
+    wedding_date = Column(Date, nullable=False, index=True)  # admin list default sort
     venue = Column(String(255), nullable=False)
     guest_count = Column(Integer, nullable=False)
 
@@ -29,8 +38,8 @@ class Event(Base):
 
     selected_package = Column(String(50), nullable=True)
 
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+    updated_at = Column(DateTime, default=utcnow, nullable=False)
 
     last_email_sent_at = Column(DateTime, nullable=True)
     reminder_count = Column(Integer, default=0, nullable=False)
@@ -41,9 +50,48 @@ class Event(Base):
     reminder_7d_sent_at = Column(DateTime, nullable=True)
     event_2d_sent_at = Column(DateTime, nullable=True)
 
+    # Offer HTML rendered once when the offer is first sent (preview/resend reuse it)
+    offer_html = Column(Text, nullable=True)
+
+    # HTML-escaped display fields, computed once per instance and shared by
+    # every email template rendered for it (offer + internal + reminders).
+    @cached_property
+    def first_name_h(self) -> str:
+        return html.escape(self.first_name or "")
+
+    @cached_property
+    def last_name_h(self) -> str:
+        return html.escape(self.last_name or "")
+
+    @cached_property
+    def wedding_date_h(self) -> str:
+        return html.escape(str(self.wedding_date))
+
+    @cached_property
+    def venue_h(self) -> str:
+        return html.escape(self.venue or "")
+
+    @cached_property
+    def email_h(self) -> str:
+        return html.escape(self.email or "")
+
+    @cached_property
+    def phone_h(self) -> str:
+        return html.escape(self.phone or "")
+
+
+# Offer reminder scans: pending + COALESCE(offer_sent_at, last_email_sent_at) cutoff.
+Index(
+    "ix_events_status_offer_base",
+    Event.status,
+    func.coalesce(Event.offer_sent_at, Event.last_email_sent_at),
+)
+
 
 class EmailLog(Base):
     __tablename__ = "email_logs"
+    # Per-event log view (ORDER BY id DESC LIMIT 200) and the resend dedupe lookup.
+    __table_args__ = (Index("ix_email_logs_event_id_id", "event_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
@@ -58,11 +106,12 @@ class EmailLog(Base):
     status = Column(String(20), nullable=False, default="sent")  # sent/failed
     error = Column(Text, nullable=True)
 
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
 
 
 class StatusChangeLog(Base):
     __tablename__ = "status_change_logs"
+    __table_args__ = (Index("ix_status_change_logs_event_id_id", "event_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
@@ -76,4 +125,4 @@ class StatusChangeLog(Base):
     actor_user_agent = Column(Text, nullable=True)
     actor_auth = Column(String(32), nullable=True)
 
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
@@ -28,15 +28,22 @@ def _make_engine():
         ssl_ctx = ssl.create_default_context()
         connect_args["ssl_context"] = ssl_ctx
 
+    pool_kwargs = {}
     if "sqlite" in url:
         connect_args = {"check_same_thread": False}
+    else:
+        # Room for request threads + reminder job; recycle before provider idle timeouts.
+        pool_kwargs = {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30, "pool_recycle": 1800}
 
-    return create_engine(url, pool_pre_ping=True, connect_args=connect_args)
+    return create_engine(url, pool_pre_ping=True, connect_args=connect_args, **pool_kwargs)
 
 
 engine = _make_engine()
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+# The dialect never changes for the process; check it once.
+IS_SQLITE = engine.dialect.name == "sqlite"
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
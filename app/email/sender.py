@@ -1,9 +1,10 @@
-import smtplib
-import ssl
-from datetime import datetime
-from email.mime.text import MIMEText
+import asyncio
+import queue
+import time
+from typing import Optional
 
-import requests
+import httpx
+import orjson
 from sqlalchemy.orm import Session
 
 from app.core.config import (
@@ -15,54 +16,334 @@ from app.core.config import (
     SMTP_PORT,
     SMTP_USER
 )
+from app.core.clock import utcnow
 from app.core.logging import logger
 from app.db.models import EmailLog
 
+RESEND_EMAILS_URL = "https://api.resend.com/emails"
+RESEND_BATCH_URL = "https://api.resend.com/emails/batch"
+RESEND_BATCH_LIMIT = 100  # max emails per /emails/batch request
+# Resend's default rate limit is 2 requests/second; space out back-to-back requests.
+_RESEND_REQUEST_INTERVAL = 0.5
+# Batch rejections caused by an invalid message (the others fail every message alike).
+_RESEND_VALIDATION_STATUSES = (400, 422)
+
+_RESEND_HEADERS = {
+    "Authorization": f"Bearer {RESEND_API_KEY}",
+    "Content-Type": "application/json",
+}
+
+# Retries only cover failed connection attempts (nothing was sent yet), so a
+# retried POST can never deliver the same email twice.
+_CONNECT_RETRIES = 2
+
+
+def _new_http_client() -> httpx.Client:
+    return httpx.Client(
+        headers=_RESEND_HEADERS,
+        timeout=httpx.Timeout(20.0, connect=3.05),
+        transport=httpx.HTTPTransport(
+            http2=True,
+            retries=_CONNECT_RETRIES,
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+        ),
+    )
+
+
+def _new_async_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        headers=_RESEND_HEADERS,
+        timeout=httpx.Timeout(20.0, connect=3.05),
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=_CONNECT_RETRIES,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        ),
+    )
+
+
+# Shared clients: HTTP/2 lets concurrent sends multiplex over one TLS session
+# instead of paying a handshake per email. Rebuilt by open_http_clients after a shutdown.
+_http = _new_http_client()
+_async_http = _new_async_http_client()
+
+
+def _resend_message(to_email: str, subject: str, body_html: str) -> dict:
+    return {
+        "from": SENDER_EMAIL,
+        "to": [to_email],
+        "subject": subject,
+        "html": body_html,
+    }
+
+
+def _resend_payload(to_email: str, subject: str, body_html: str) -> bytes:
+    """JSON body for /emails, serialized straight to UTF-8 bytes by orjson."""
+    return orjson.dumps(_resend_message(to_email, subject, body_html))
+
+
+def _resend_batch_payload(messages: list[tuple[str, str, str]]) -> bytes:
+    return orjson.dumps([_resend_message(*m) for m in messages])
+
+
+def _resend_batch_ids(content: bytes, count: int) -> list[Optional[str]]:
+    data = orjson.loads(content).get("data") or []
+    ids = [item.get("id") for item in data]
+    return (ids + [None] * count)[:count]
+
+
+def _chunks(messages: list, size: int = RESEND_BATCH_LIMIT) -> list[list]:
+    return [messages[i:i + size] for i in range(0, len(messages), size)]
+
 
 def send_email_resend(to_email: str, subject: str, body_html: str):
     if not RESEND_API_KEY:
         raise RuntimeError("RESEND_API_KEY is not set")
-    r = requests.post(
-        "https://api.resend.com/emails",
-        headers={
-            "Authorization": f"Bearer {RESEND_API_KEY}",
-            "Content-Type": "application/json",
-        },
-        json={
-            "from": SENDER_EMAIL,
-            "to": [to_email],
-            "subject": subject,
-            "html": body_html,
-        },
-        timeout=20,
-    )
+    r = _http.post(RESEND_EMAILS_URL, content=_resend_payload(to_email, subject, body_html))
     r.raise_for_status()
-    data = r.json()
+    data = orjson.loads(r.content)
     return data.get("id")
 
 
-def send_email_smtp(to_email: str, subject: str, body_html: str):
-    if not SMTP_HOST:
-        raise RuntimeError("SMTP_HOST is not set")
+async def send_email_resend_async(to_email: str, subject: str, body_html: str):
+    if not RESEND_API_KEY:
+        raise RuntimeError("RESEND_API_KEY is not set")
+    r = await _async_http.post(RESEND_EMAILS_URL, content=_resend_payload(to_email, subject, body_html))
+    r.raise_for_status()
+    data = orjson.loads(r.content)
+    return data.get("id")
+
+
+def _smtp_message(to_email: str, subject: str, body_html: str):
+    # Imported lazily: the SMTP path is off by default (Resend) and the email
+    # package is not worth paying for on every cold start.
+    from email.mime.text import MIMEText
+
     msg = MIMEText(body_html, "html", "utf-8")
     msg["Subject"] = subject
     msg["From"] = SENDER_EMAIL
     msg["To"] = to_email
+    return msg
+
+
+# Authenticated SMTP_SSL connections kept open between sends, so each email
+# skips the TLS handshake + login. Stale or dead connections are replaced.
+_SMTP_POOL_SIZE = 4
+_SMTP_MAX_AGE = 300  # seconds
+# Socket timeout (seconds): an idle pooled connection silently dropped by a NAT
+# or the server must fail fast instead of hanging a worker thread.
+_SMTP_TIMEOUT = 20
+_smtp_pool: "queue.Queue[tuple]" = queue.Queue(maxsize=_SMTP_POOL_SIZE)
+
+
+def _smtp_connect() -> tuple:
+    import smtplib
+    import ssl
+
+    server = smtplib.SMTP_SSL(
+        SMTP_HOST, SMTP_PORT, timeout=_SMTP_TIMEOUT, context=ssl.create_default_context()
+    )
+    if SMTP_USER:
+        server.login(SMTP_USER, SMTP_PASSWORD)
+    return server, time.monotonic()
+
+
+def _smtp_close(server) -> None:
+    try:
+        server.quit()
+    except Exception:
+        pass
+
+
+def _smtp_acquire() -> tuple:
+    while True:
+        try:
+            server, created = _smtp_pool.get_nowait()
+        except queue.Empty:
+            return _smtp_connect()
+        if time.monotonic() - created < _SMTP_MAX_AGE:
+            try:
+                if server.noop()[0] == 250:
+                    return server, created
+            except Exception:
+                pass
+        _smtp_close(server)
+
+
+def _smtp_release(conn: tuple) -> None:
+    try:
+        _smtp_pool.put_nowait(conn)
+    except queue.Full:
+        _smtp_close(conn[0])
 
-    context = ssl.create_default_context()
-    with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=context) as server:
-        if SMTP_USER:
-            server.login(SMTP_USER, SMTP_PASSWORD)
-        server.sendmail(SENDER_EMAIL, [to_email], msg.as_string())
+
+def close_smtp_pool() -> None:
+    while True:
+        try:
+            server, _ = _smtp_pool.get_nowait()
+        except queue.Empty:
+            return
+        _smtp_close(server)
+
+
+def send_email_smtp(to_email: str, subject: str, body_html: str):
+    if not SMTP_HOST:
+        raise RuntimeError("SMTP_HOST is not set")
+    msg = _smtp_message(to_email, subject, body_html)
+    server, created = _smtp_acquire()
+    try:
+        server.sendmail(SENDER_EMAIL, [to_email], msg.as_bytes())
+    except Exception:
+        # Connection state is unknown after a failure; don't hand it back out.
+        _smtp_close(server)
+        raise
+    _smtp_release((server, created))
     return None
 
 
+# Process-wide cap on in-flight async SMTP sends (submission servers allow only a
+# few concurrent authenticated sessions); created on the running loop at first use.
+_smtp_slots: Optional[asyncio.Semaphore] = None
+_smtp_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _smtp_send_slots() -> asyncio.Semaphore:
+    global _smtp_slots, _smtp_slots_loop
+    loop = asyncio.get_running_loop()
+    if _smtp_slots is None or _smtp_slots_loop is not loop:
+        _smtp_slots = asyncio.Semaphore(_SMTP_POOL_SIZE)
+        _smtp_slots_loop = loop
+    return _smtp_slots
+
+
+async def send_email_smtp_async(to_email: str, subject: str, body_html: str):
+    """SMTP send for async callers, on a worker thread over the pooled connections.
+
+    At most _SMTP_POOL_SIZE of these run at once across the process.
+    """
+    async with _smtp_send_slots():
+        return await asyncio.to_thread(send_email_smtp, to_email, subject, body_html)
+
+
 def send_email(to_email: str, subject: str, body_html: str):
     if EMAIL_PROVIDER == "smtp":
         return send_email_smtp(to_email, subject, body_html)
     return send_email_resend(to_email, subject, body_html)
 
 
+async def _send_resend_batch_async(messages: list[tuple[str, str, str]]) -> list:
+    if not RESEND_API_KEY:
+        raise RuntimeError("RESEND_API_KEY is not set")
+    r = await _async_http.post(RESEND_BATCH_URL, content=_resend_batch_payload(messages))
+    r.raise_for_status()
+    return _resend_batch_ids(r.content, len(messages))
+
+
+async def _send_resend_chunk_async(chunk: list[tuple[str, str, str]]) -> list:
+    """One /emails/batch request; never raises (see send_email_batch_async).
+
+    Batch validation is all-or-nothing, so a batch rejected as invalid (400/422)
+    is retried one message at a time and only the bad message fails. Anything
+    else (auth, rate limit, size, 5xx) would fail every single send the same way.
+    """
+    try:
+        return await _send_resend_batch_async(chunk)
+    except httpx.HTTPStatusError as ex:
+        if ex.response.status_code not in _RESEND_VALIDATION_STATUSES or len(chunk) == 1:
+            return [ex] * len(chunk)
+    except Exception as ex:
+        return [ex] * len(chunk)
+
+    results = []
+    for m in chunk:
+        await asyncio.sleep(_RESEND_REQUEST_INTERVAL)
+        try:
+            results.append(await send_email_resend_async(*m))
+        except Exception as ex:
+            results.append(ex)
+    return results
+
+
+async def send_email_batch_async(messages: list[tuple[str, str, str]]) -> list:
+    """Send several (to_email, subject, body_html) emails, batched via Resend /emails/batch.
+
+    Never raises: returns one entry per message, in order — the provider message
+    id, or the exception that message failed with. Batch requests go out one
+    after another to stay under the rate limit; SMTP sends share the
+    process-wide _SMTP_POOL_SIZE limit of send_email_smtp_async.
+    """
+    if EMAIL_PROVIDER == "smtp":
+        return await asyncio.gather(*(send_email_smtp_async(*m) for m in messages), return_exceptions=True)
+    results = []
+    for i, chunk in enumerate(_chunks(messages)):
+        if i:
+            await asyncio.sleep(_RESEND_REQUEST_INTERVAL)
+        results.extend(await _send_resend_chunk_async(chunk))
+    return results
+
+
+def open_http_clients() -> None:
+    """(Re)create the shared clients at app startup; a previous shutdown closed them."""
+    global _http, _async_http
+    if _http.is_closed:
+        _http = _new_http_client()
+    if _async_http.is_closed:
+        _async_http = _new_async_http_client()
+
+
+async def aclose_http_clients() -> None:
+    _http.close()
+    await _async_http.aclose()
+    close_smtp_pool()
+
+
+def email_log_values(
+    event_id: int,
+    email_type: str,
+    to_email: str,
+    subject: str,
+    provider_message_id: Optional[str] = None,
+    error: Optional[str] = None,
+) -> dict:
+    """Column values for an EmailLog row (status derived from error)."""
+    return {
+        "event_id": event_id,
+        "email_type": email_type,
+        "to_email": to_email,
+        "subject": subject[:255],
+        "provider": EMAIL_PROVIDER,
+        "provider_message_id": provider_message_id,
+        "status": "failed" if error is not None else "sent",
+        "error": error,
+        "created_at": utcnow(),
+    }
+
+
+def email_log_values_for_result(event_id: int, email_type: str, to_email: str, subject: str, result) -> dict:
+    """EmailLog values for a send_email_batch_async result (provider id or exception)."""
+    if isinstance(result, BaseException):
+        return email_log_values(event_id, email_type, to_email, subject, error=str(result))
+    return email_log_values(event_id, email_type, to_email, subject, provider_message_id=result)
+
+
+def record_email_log(
+    db: Session,
+    event_id: int,
+    email_type: str,
+    to_email: str,
+    subject: str,
+    provider_message_id: Optional[str] = None,
+    error: Optional[str] = None,
+) -> None:
+    """Persist a single EmailLog row; never raises."""
+    try:
+        db.add(EmailLog(**email_log_values(event_id, email_type, to_email, subject, provider_message_id, error)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("email_log_write_failed", extra={"event_id": event_id, "email_type": email_type})
+
+
 def send_email_logged(db: Session, event_id: int, email_type: str, to_email: str, subject: str, body_html: str) -> None:
     """Send email and persist an audit log row.
 
@@ -70,31 +351,12 @@ def send_email_logged(db: Session, event_id: int, email_type: str, to_email: str
     Caller can decide whether to retry / revert flags on failure.
     """
     provider_message_id = None
-    status = "sent"
     error = None
     try:
         provider_message_id = send_email(to_email, subject, body_html)
     except Exception as ex:
-        status = "failed"
         error = str(ex)
         logger.exception("email_send_failed", extra={"event_id": event_id, "email_type": email_type, "to": to_email})
         raise
     finally:
-        try:
-            db.add(
-                EmailLog(
-                    event_id=event_id,
-                    email_type=email_type,
-                    to_email=to_email,
-                    subject=subject[:255],
-                    provider=EMAIL_PROVIDER,
-                    provider_message_id=provider_message_id,
-                    status=status,
-                    error=error,
-                    created_at=datetime.utcnow(),
-                )
-            )
-            db.commit()
-        except Exception:
-            db.rollback()
-            logger.exception("email_log_write_failed", extra={"event_id": event_id, "email_type": email_type})
+        record_email_log(db, event_id, email_type, to_email, subject, provider_message_id, error)
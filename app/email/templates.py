@@ -15,27 +15,21 @@ def _nl2br_escaped(text: str) -> str:
     return html.escape(text).replace("\n", "<br>")
 
 
-def render_offer_html(e: Event) -> str:
-    """
-    FULL (old) rich offer email template restored from your previous working main.py.
-    Note: we do NOT depend on frontend/offer.html because you said you don't have it in Git.
-    """
+_LOGO_URL = f"{BASE_URL}/frontend/logo.png"
+_COCKTAILS_PDF_URL = f"{BASE_URL}/frontend/cocktails.pdf"
+_BAR_IMG_URL = f"{BASE_URL}/frontend/bar.jpeg"
+_CIGARE_IMG_URL = f"{BASE_URL}/frontend/cigare.png"
 
-    logo_url = f"{BASE_URL}/frontend/logo.png"
-    cocktails_pdf = f"{BASE_URL}/frontend/cocktails.pdf"
-    bar_img = f"{BASE_URL}/frontend/bar.jpeg"
-    cigare_img = f"{BASE_URL}/frontend/cigare.png"
-    accept_link = f"{BASE_URL}/accept?token={e.token}"
-    decline_link = (
-        "mailto:catering@landskybar.com"
-        f"?subject=Odbijanje%20ponude%20-%20{e.token}"
-        "&body=Po%C5%A1tovani%2C%20molim%20ozna%C4%8Dite%20ponudu%20kao%20odbijenu."
-    )
-
-    msg = (e.message or "").strip()
-    msg_html = _nl2br_escaped(msg) if msg else "(nema)"
+# Per-event links are these fixed prefixes + the token.
+_ACCEPT_URL_PREFIX = f"{BASE_URL}/accept?token="
+_PREVIEW_URL_PREFIX = f"{BASE_URL}/offer-preview?token="
+_ADMIN_URL = f"{BASE_URL}/admin"
+_DECLINE_MAILTO_PREFIX = "mailto:catering@landskybar.com?subject=Odbijanje%20ponude%20-%20"
+_DECLINE_MAILTO_SUFFIX = "&body=Po%C5%A1tovani%2C%20molim%20ozna%C4%8Dite%20ponudu%20kao%20odbijenu."
 
-    return f"""
+# The offer is ~90% static markup: bake BASE_URL-derived links in once at import
+# and leave only the per-event fields as str.format_map placeholders.
+_OFFER_TEMPLATE = f"""
 <div style="font-family: Arial, sans-serif; color:#111; line-height:1.5;">
   <div style="max-width:720px; margin:0 auto; border:1px solid #eee; border-radius:14px; overflow:hidden;">
 
@@ -44,7 +38,7 @@ def render_offer_html(e: Event) -> str:
       <tr>
         <!-- LEFT: logo -->
         <td width="110" align="left" valign="middle" style="padding:18px;">
-          <img src="{logo_url}" alt="Landsky Cocktail Catering"
+          <img src="{_LOGO_URL}" alt="Landsky Cocktail Catering"
                width="80" height="80"
                style="display:block; width:80px; height:80px; object-fit:contain; border-radius:14px; background:#ffffff; padding:8px; border:0;" />
         </td>
@@ -68,18 +62,18 @@ def render_offer_html(e: Event) -> str:
 
     <div style="padding:18px;">
       <div style="font-size:14px;">
-        Poštovani/Poštovana <b>{html.escape(e.first_name)} {html.escape(e.last_name)}</b>,<br>
+        Poštovani/Poštovana <b>{{first_name}} {{last_name}}</b>,<br>
         zahvaljujemo na Vašem upitu. U nastavku dostavljamo informacije vezane za cocktail catering.
       </div>
 
       <div style="margin-top:14px; padding:14px; border:1px solid #eee; border-radius:12px; background:#fafafa;">
         <div style="font-weight:700; margin-bottom:8px;">Sažetak upita</div>
-        <div>📅 <b>Datum:</b> {html.escape(str(e.wedding_date))}</div>
-        <div>📍 <b>Lokacija / sala:</b> {html.escape(e.venue)}</div>
-        <div>👥 <b>Broj gostiju:</b> {e.guest_count}</div>
-        <div>✉️ <b>Email:</b> {html.escape(e.email)}</div>
-        <div>📞 <b>Telefon:</b> {html.escape(e.phone)}</div>
-        <div style="margin-top:8px;"><b>Napomena / pitanja:</b><br>{msg_html}</div>
+        <div>📅 <b>Datum:</b> {{wedding_date}}</div>
+        <div>📍 <b>Lokacija / sala:</b> {{venue}}</div>
+        <div>👥 <b>Broj gostiju:</b> {{guest_count}}</div>
+        <div>✉️ <b>Email:</b> {{email}}</div>
+        <div>📞 <b>Telefon:</b> {{phone}}</div>
+        <div style="margin-top:8px;"><b>Napomena / pitanja:</b><br>{{msg_html}}</div>
       </div>
 
       <div style="margin-top:14px; padding:14px; border:1px solid #ffe8c2; border-radius:12px; background:#fff7ea;">
@@ -107,17 +101,17 @@ def render_offer_html(e: Event) -> str:
         </div>
 
         <div style="margin-top:10px;">
-          📎 Detalji paketa: <a href="{cocktails_pdf}" target="_blank" style="color:#0b57d0;">{cocktails_pdf}</a>
+          📎 Detalji paketa: <a href="{_COCKTAILS_PDF_URL}" target="_blank" style="color:#0b57d0;">{_COCKTAILS_PDF_URL}</a>
         </div>
       </div>
 
       <div style="margin-top:14px; padding:14px; border:1px solid #eee; border-radius:12px; background:#fff;">
         <div style="font-weight:700; margin-bottom:8px;">Premium cigare (opcionalno)</div>
         <div>Uz odabir cigara od nas dobivate humidor, rezac, upaljač i pepeljaru.</div>
-        <div style="margin-top:8px;">📎 Popis cigara: <a href="{cigare_img}" target="_blank" style="color:#0b57d0;">{cigare_img}</a></div>
+        <div style="margin-top:8px;">📎 Popis cigara: <a href="{_CIGARE_IMG_URL}" target="_blank" style="color:#0b57d0;">{_CIGARE_IMG_URL}</a></div>
         <div style="margin-top:8px;">Za događaje izvan Zagreba naplaćuje se put <b>0,70 EUR/km</b>.</div>
         <div style="margin-top:8px;">Rado Vas pozivamo na prezentaciju koktela u našem LandSky Baru (Draškovićeva 144), gdje ćemo Vam detaljno predstaviti našu uslugu i odabrati najbolje za vaš event.</div>
-        <div style="margin-top:8px;">📎 Fotografija bara: <a href="{bar_img}" target="_blank" style="color:#0b57d0;">{bar_img}</a></div>
+        <div style="margin-top:8px;">📎 Fotografija bara: <a href="{_BAR_IMG_URL}" target="_blank" style="color:#0b57d0;">{_BAR_IMG_URL}</a></div>
       </div>
 
       <div style="margin-top:14px; padding:14px; border:1px solid #e8f5e9; border-radius:12px; background:#f2fbf3;">
@@ -128,13 +122,13 @@ def render_offer_html(e: Event) -> str:
         <table role="presentation" cellpadding="0" cellspacing="0" style="margin-top:10px;">
           <tr>
             <td>
-              <a href="{accept_link}" style="background:#1b5e20; color:#fff; text-decoration:none; padding:10px 14px; border-radius:10px; font-weight:700; display:inline-block;">
+              <a href="{{accept_link}}" style="background:#1b5e20; color:#fff; text-decoration:none; padding:10px 14px; border-radius:10px; font-weight:700; display:inline-block;">
                 ✅ Prihvaćam
               </a>
             </td>
             <td style="width:10px;"></td>
             <td>
-              <a href="{decline_link}" style="background:#b71c1c; color:#fff; text-decoration:none; padding:10px 14px; border-radius:10px; font-weight:700; display:inline-block;">
+              <a href="{{decline_link}}" style="background:#b71c1c; color:#fff; text-decoration:none; padding:10px 14px; border-radius:10px; font-weight:700; display:inline-block;">
                 ❌ Odbijam (pošalji email)
               </a>
             </td>
@@ -159,58 +153,111 @@ def render_offer_html(e: Event) -> str:
 """
 
 
-def internal_email_body(e: Event) -> str:
-    preview_link = f"{BASE_URL}/offer-preview?token={e.token}"
-    admin_link = f"{BASE_URL}/admin"
+def render_offer_html(e: Event) -> str:
+    """
+    FULL (old) rich offer email template restored from your previous working main.py.
+    Note: we do NOT depend on frontend/offer.html because you said you don't have it in Git.
+    """
+    decline_link = _DECLINE_MAILTO_PREFIX + e.token + _DECLINE_MAILTO_SUFFIX
+
     msg = (e.message or "").strip()
-    msg_html = _nl2br_escaped(msg) if msg else "(nema)"
-    chosen = getattr(e, "selected_package", None) or "—"
 
-    return f"""
+    return _OFFER_TEMPLATE.format_map(
+        {
+            "first_name": e.first_name_h,
+            "last_name": e.last_name_h,
+            "wedding_date": e.wedding_date_h,
+            "venue": e.venue_h,
+            "guest_count": e.guest_count,
+            "email": e.email_h,
+            "phone": e.phone_h,
+            "msg_html": _nl2br_escaped(msg) if msg else "(nema)",
+            "accept_link": _ACCEPT_URL_PREFIX + e.token,
+            "decline_link": decline_link,
+        }
+    )
+
+
+_INTERNAL_TEMPLATE = f"""
 <div style="font-family: Arial, sans-serif; color:#111; line-height:1.5;">
   <h2>Novi upit</h2>
   <ul>
-    <li><b>Klijent:</b> {html.escape(e.first_name)} {html.escape(e.last_name)}</li>
-    <li><b>Email klijenta:</b> {html.escape(e.email)}</li>
-    <li><b>Telefon:</b> {html.escape(e.phone)}</li>
-    <li><b>Datum:</b> {html.escape(str(e.wedding_date))}</li>
-    <li><b>Sala:</b> {html.escape(e.venue)}</li>
-    <li><b>Gosti:</b> {e.guest_count}</li>
-    <li><b>Status:</b> {html.escape(getattr(e, "status", ""))}</li>
-    <li><b>Odabrani paket:</b> {html.escape(chosen)}</li>
+    <li><b>Klijent:</b> {{first_name}} {{last_name}}</li>
+    <li><b>Email klijenta:</b> {{email}}</li>
+    <li><b>Telefon:</b> {{phone}}</li>
+    <li><b>Datum:</b> {{wedding_date}}</li>
+    <li><b>Sala:</b> {{venue}}</li>
+    <li><b>Gosti:</b> {{guest_count}}</li>
+    <li><b>Status:</b> {{status}}</li>
+    <li><b>Odabrani paket:</b> {{chosen}}</li>
   </ul>
-  <p><b>Napomena / Pitanja:</b><br>{msg_html}</p>
-  <p><b>Preview ponude:</b><br><a href="{preview_link}">{preview_link}</a></p>
-  <p><b>Admin:</b> <a href="{admin_link}">{admin_link}</a></p>
+  <p><b>Napomena / Pitanja:</b><br>{{msg_html}}</p>
+  <p><b>Preview ponude:</b><br><a href="{{preview_link}}">{{preview_link}}</a></p>
+  <p><b>Admin:</b> <a href="{_ADMIN_URL}">{_ADMIN_URL}</a></p>
 </div>
 """
 
 
-def reminder_email_body(e: Event) -> str:
-    accept_link = f"{BASE_URL}/accept?token={e.token}"
-    decline_link = (
-        "mailto:catering@landskybar.com"
-        f"?subject=Odbijanje%20ponude%20-%20{e.token}"
-        "&body=Po%C5%A1tovani%2C%20molim%20ozna%C4%8Dite%20ponudu%20kao%20odbijenu."
+def internal_email_body(e: Event) -> str:
+    msg = (e.message or "").strip()
+    return _INTERNAL_TEMPLATE.format_map(
+        {
+            "first_name": e.first_name_h,
+            "last_name": e.last_name_h,
+            "email": e.email_h,
+            "phone": e.phone_h,
+            "wedding_date": e.wedding_date_h,
+            "venue": e.venue_h,
+            "guest_count": e.guest_count,
+            "status": html.escape(getattr(e, "status", "") or ""),
+            "chosen": html.escape(getattr(e, "selected_package", None) or "—"),
+            "msg_html": _nl2br_escaped(msg) if msg else "(nema)",
+            "preview_link": _PREVIEW_URL_PREFIX + e.token,
+        }
     )
-    return f"""
+
+
+_REMINDER_TEMPLATE = """
 <div style="font-family: Arial, sans-serif; color:#111; line-height:1.5; max-width:700px; margin:0 auto;">
   <h2>Podsjetnik — Landsky Cocktail Catering ponuda</h2>
-  <p>Poštovani {html.escape(e.first_name)} {html.escape(e.last_name)},</p>
-  <p>Samo kratki podsjetnik vezano za našu ponudu za datum <b>{html.escape(str(e.wedding_date))}</b> ({html.escape(e.venue)}).</p>
+  <p>Poštovani {first_name} {last_name},</p>
+  <p>Samo kratki podsjetnik vezano za našu ponudu za datum <b>{wedding_date}</b> ({venue}).</p>
   <p>✅ <a href="{accept_link}">Prihvaćam ponudu</a><br>
      ❌ <a href="{decline_link}">Odbijam ponudu (email)</a></p>
 </div>
 """
 
-
-def event_2d_email_body(e: Event) -> str:
-    return f"""
+_EVENT_2D_TEMPLATE = """
 <div style="font-family: Arial, sans-serif; color:#111; line-height:1.5; max-width:700px; margin:0 auto;">
   <h2>Podsjetnik — Vaš događaj je uskoro</h2>
-  <p>Poštovani {html.escape(e.first_name)} {html.escape(e.last_name)},</p>
-  <p>Samo kratka potvrda da smo sve spremni za vaš datum <b>{html.escape(str(e.wedding_date))}</b> na lokaciji <b>{html.escape(e.venue)}</b>.</p>
+  <p>Poštovani {first_name} {last_name},</p>
+  <p>Samo kratka potvrda da smo sve spremni za vaš datum <b>{wedding_date}</b> na lokaciji <b>{venue}</b>.</p>
   <p>Ako imate bilo kakve promjene oko broja gostiju ili detalja, slobodno nam se javite.</p>
   <p>Srdačno,<br>Landsky Cocktail Catering</p>
 </div>
 """
+
+
+def reminder_email_body(e: Event) -> str:
+    decline_link = _DECLINE_MAILTO_PREFIX + e.token + _DECLINE_MAILTO_SUFFIX
+    return _REMINDER_TEMPLATE.format_map(
+        {
+            "first_name": e.first_name_h,
+            "last_name": e.last_name_h,
+            "wedding_date": e.wedding_date_h,
+            "venue": e.venue_h,
+            "accept_link": _ACCEPT_URL_PREFIX + e.token,
+            "decline_link": decline_link,
+        }
+    )
+
+
+def event_2d_email_body(e: Event) -> str:
+    return _EVENT_2D_TEMPLATE.format_map(
+        {
+            "first_name": e.first_name_h,
+            "last_name": e.last_name_h,
+            "wedding_date": e.wedding_date_h,
+            "venue": e.venue_h,
+        }
+    )
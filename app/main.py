@@ -1,26 +1,85 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api.routers import admin as admin_router
 from app.api.routers import health as health_router
 from app.api.routers import public as public_router
-from app.core.config import REMINDERS_ENABLED
+from app.core.config import OFFER_REDRIVE_ENABLED, REMINDERS_ENABLED, RUN_MIGRATIONS_ON_STARTUP
 from app.core.logging import logger
 from app.db.migrations import run_additive_migrations
 from app.db.models import Base
 from app.db.session import engine
+from app.email.sender import aclose_http_clients, open_http_clients
 
 # Optional scheduler
 try:
-    from apscheduler.schedulers.background import BackgroundScheduler  # type: ignore
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler  # type: ignore
 except Exception:
-    BackgroundScheduler = None
+    AsyncIOScheduler = None
 
+from app.services.offers import redrive_unsent_offers
 from app.services.reminders import reminder_job
 
 
+class _CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers/email clients cache assets (HTML still revalidates)."""
+
+    def file_response(self, full_path, *args, **kwargs):
+        response = super().file_response(full_path, *args, **kwargs)
+        if not str(full_path).endswith(".html"):
+            # Asset names are not fingerprinted, so a day rather than a year.
+            response.headers.setdefault("Cache-Control", "public, max-age=86400")
+        return response
+
+
+# Worker threads for asyncio.to_thread (DB work of background sends + reminder job).
+_DEFAULT_EXECUTOR_WORKERS = 8
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bounded pool so a burst of background sends cannot spawn a thread per task.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=_DEFAULT_EXECUTOR_WORKERS, thread_name_prefix="app-worker")
+    )
+    open_http_clients()
+
+    # Create tables + additive migrations (skipped when run once per deploy)
+    if RUN_MIGRATIONS_ON_STARTUP:
+        Base.metadata.create_all(bind=engine)
+        run_additive_migrations(engine)
+
+    # Scheduler (runs the async reminder_job / offer redrive on this event loop)
+    scheduler = None
+    if (REMINDERS_ENABLED or OFFER_REDRIVE_ENABLED) and AsyncIOScheduler is not None:
+        scheduler = AsyncIOScheduler(event_loop=asyncio.get_running_loop())
+        app.state.scheduler = scheduler
+        if REMINDERS_ENABLED:
+            scheduler.add_job(reminder_job, "interval", hours=1)
+        if OFFER_REDRIVE_ENABLED:
+            scheduler.add_job(redrive_unsent_offers, "interval", minutes=15)
+        scheduler.start()
+        logger.info(
+            "Scheduler started.", extra={"reminders": REMINDERS_ENABLED, "offer_redrive": OFFER_REDRIVE_ENABLED}
+        )
+    else:
+        logger.info("Scheduler disabled or APScheduler not installed.")
+
+    try:
+        yield
+    finally:
+        if scheduler is not None:
+            scheduler.shutdown(wait=False)
+        await aclose_http_clients()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="Landsky Wedding App")
+    app = FastAPI(title="Landsky Wedding App", default_response_class=ORJSONResponse, lifespan=lifespan)
 
     # Routers
     app.include_router(health_router.router)
@@ -28,23 +87,7 @@ def create_app() -> FastAPI:
     app.include_router(admin_router.router)
 
     # Static frontend
-    app.mount("/frontend", StaticFiles(directory="frontend", html=True), name="frontend")
-
-    @app.on_event("startup")
-    def _startup():
-        # Create tables + additive migrations
-        Base.metadata.create_all(bind=engine)
-        run_additive_migrations(engine)
-
-        # Scheduler
-        if REMINDERS_ENABLED and BackgroundScheduler is not None:
-            scheduler = BackgroundScheduler()
-            app.state.scheduler = scheduler
-            scheduler.add_job(reminder_job, "interval", hours=1)
-            scheduler.start()
-            logger.info("Reminder scheduler started.")
-        else:
-            logger.info("Reminder scheduler disabled or APScheduler not installed.")
+    app.mount("/frontend", _CachedStaticFiles(directory="frontend", html=True), name="frontend")
 
     return app
 
@@ -1,84 +1,279 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta
 from typing import Optional
 
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, exists, func, insert, or_, select, text, update
+from sqlalchemy.orm import Session, raiseload
 
 from app.core.config import CATERING_TEAM_EMAIL, TEST_MODE
-from app.core.logging import log_evt
-from app.db.models import Event
-from app.email.sender import send_email, send_email_logged
+from app.core.clock import utcnow
+from app.core.logging import log_evt, logger
+from app.db.models import EmailLog, Event
+from app.db.session import IS_SQLITE, SessionLocal
+from app.email.sender import email_log_values_for_result, send_email_batch_async, send_email_logged
 from app.email.templates import internal_email_body, render_offer_html
 
+# The two emails of the initial offer flow (EmailLog.email_type).
+_OFFER_EMAIL_TYPES = ("internal_new_inquiry", "offer")
+# A sent admin resend delivered the offer too, so it counts as a sent offer.
+_OFFER_DELIVERED_TYPES = ("offer", "resend_offer")
 
-def send_offer_flow(e: Event, db: Optional[Session] = None):
-    """Send internal notification + customer offer.
+# Statements built once at import so SQLAlchemy's compiled cache is reused.
+# A claim older than :stale_before with no sent offer logged was lost mid-send
+# (process died between claim and result write) and may be taken over.
+_CLAIM_OFFER_SQL = text(
+    "UPDATE events SET offer_sent_at=:now, last_email_sent_at=:now, updated_at=:now "
+    "WHERE id=:id AND (offer_sent_at IS NULL OR (offer_sent_at <= :stale_before AND NOT EXISTS ("
+    "SELECT 1 FROM email_logs WHERE email_logs.event_id=events.id "
+    "AND email_logs.email_type IN ('offer', 'resend_offer') AND email_logs.status='sent')))"
+)
+_REVERT_OFFER_SQL = text("UPDATE events SET offer_sent_at=NULL WHERE id=:id AND offer_sent_at=:ts")
+# Email flows only read Event columns; any relationship access must be eager-loaded explicitly.
+_NO_LAZY = (raiseload("*"),)
+# Offer-flow emails that already went out for an event (a retry sends only the rest).
+_SENT_OFFER_TYPES_STMT = select(EmailLog.email_type).where(
+    EmailLog.event_id == bindparam("id"),
+    EmailLog.email_type.in_(_OFFER_EMAIL_TYPES + ("resend_offer",)),
+    EmailLog.status == "sent",
+)
 
-    Idempotency: when db is provided, we atomically *claim* offer_sent_at to prevent duplicates.
-    """
-    claim_ts: Optional[datetime] = None
+# Unsent offers are retried once they are this old (the request's own task had
+# its chance), for up to this long after registration, a batch per run.
+_REDRIVE_AFTER = timedelta(minutes=10)
+_REDRIVE_WINDOW = timedelta(days=2)
+_REDRIVE_BATCH = 50
+# A claim this old without a sent offer is treated as lost.
+_STALE_CLAIM = timedelta(minutes=30)
+# Give up after this many failed offer-flow sends (one failed EmailLog row each).
+_REDRIVE_MAX_FAILED_SENDS = 5
+
+_OFFER_SENT = exists().where(
+    EmailLog.event_id == Event.id, EmailLog.email_type.in_(_OFFER_DELIVERED_TYPES), EmailLog.status == "sent"
+)
+_OFFER_FAILED_SENDS = (
+    select(func.count(EmailLog.id))
+    .where(EmailLog.event_id == Event.id, EmailLog.email_type.in_(_OFFER_EMAIL_TYPES), EmailLog.status == "failed")
+    .correlate(Event)
+    .scalar_subquery()
+)
+
+_TRY_LOCK_SQL = text("SELECT pg_try_advisory_lock(:k)")
+_UNLOCK_SQL = text("SELECT pg_advisory_unlock(:k)")
 
-    if db is not None:
-        # Atomically claim the initial offer send (prevents retries / double-clicks).
-        claim_ts = datetime.utcnow()
+
+def _claim_and_render_offer(db: Session, event_id: int, claim_ts: datetime) -> Optional[dict]:
+    """Claim offer_sent_at (atomic, prevents retries / double-clicks) and render the emails.
+
+    Runs in a worker thread; returns None if the event is gone or already claimed.
+    Emails a previous attempt already sent are left out of "messages".
+    """
+    try:
         res = db.execute(
-            text(
-                "UPDATE events SET offer_sent_at=:now, last_email_sent_at=:now, updated_at=:now "
-                "WHERE id=:id AND offer_sent_at IS NULL"
-            ),
-            {"now": claim_ts, "id": e.id},
+            _CLAIM_OFFER_SQL, {"now": claim_ts, "stale_before": claim_ts - _STALE_CLAIM, "id": event_id}
         )
-        db.commit()
         if res.rowcount != 1:
-            log_evt("info", "offer_skipped", event_id=e.id, email_type="offer", reason="already_sent")
-            return
+            db.rollback()
+            log_evt("info", "offer_skipped", event_id=event_id, email_type="offer", reason="already_sent")
+            return None
+        e = db.get(Event, event_id, options=_NO_LAZY)
 
+        # internal notification + customer offer, sent as a single batch request
+        offer_recipient = CATERING_TEAM_EMAIL if TEST_MODE else e.email
+        body_offer = e.offer_html or render_offer_html(e)
+        messages = [
+            (
+                "internal_new_inquiry",
+                CATERING_TEAM_EMAIL,
+                f"Novi upit: {e.first_name} {e.last_name}{' (TEST)' if TEST_MODE else ''}",
+                internal_email_body(e),
+            ),
+            (
+                "offer",
+                offer_recipient,
+                f"Ponuda – {e.first_name} {e.last_name}{' (TEST)' if TEST_MODE else ''}",
+                body_offer,
+            ),
+        ]
+        already_sent = set(db.execute(_SENT_OFFER_TYPES_STMT, {"id": event_id}).scalars())
+        if already_sent.intersection(_OFFER_DELIVERED_TYPES):
+            already_sent.add("offer")
+        messages = [m for m in messages if m[0] not in already_sent]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"recipient": offer_recipient, "body_offer": body_offer, "messages": messages}
+
+
+def _record_offer_results(db: Session, event_id: int, offer: dict, results: list, claim_ts: datetime) -> bool:
+    """Write the EmailLog rows and either finalize or revert the claim (one commit)."""
+    failed = any(isinstance(r, BaseException) for r in results)
     try:
-        # internal notification
-        subject_internal = f"Novi upit: {e.first_name} {e.last_name}{' (TEST)' if TEST_MODE else ''}"
-        body_internal = internal_email_body(e)
-        if db is not None:
-            send_email_logged(db, e.id, "internal_new_inquiry", CATERING_TEAM_EMAIL, subject_internal, body_internal)
+        if results:
+            db.execute(
+                insert(EmailLog),
+                [email_log_values_for_result(event_id, m[0], m[1], m[2], r) for m, r in zip(offer["messages"], results)],
+            )
+        if failed:
+            # Revert the claim so the system can retry safely.
+            db.execute(_REVERT_OFFER_SQL, {"id": event_id, "ts": claim_ts})
         else:
-            send_email(CATERING_TEAM_EMAIL, subject_internal, body_internal)
+            # Keep these resets for the reminder flow
+            db.execute(
+                update(Event)
+                .where(Event.id == event_id)
+                .values(
+                    offer_html=offer["body_offer"],
+                    last_email_sent_at=claim_ts,
+                    reminder_count=0,
+                    reminder_3d_sent_at=None,
+                    reminder_7d_sent_at=None,
+                    updated_at=claim_ts,
+                )
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("offer: result write failed", extra={"event_id": event_id})
+    return not failed
+
+
+async def send_offer_flow(event_id: int, db: Session) -> None:
+    """Send internal notification + customer offer.
+
+    DB work runs in a worker thread (sync SQLAlchemy); both emails are sent
+    on the event loop, so no thread is held during the provider round trip.
+    """
+    claim_ts = utcnow()
+    offer = await asyncio.to_thread(_claim_and_render_offer, db, event_id, claim_ts)
+    if offer is None:
+        return
+
+    # Nothing left to send when earlier attempts (or an admin resend) delivered everything.
+    results = await send_email_batch_async([m[1:] for m in offer["messages"]]) if offer["messages"] else []
+    for m, r in zip(offer["messages"], results):
+        if isinstance(r, BaseException):
+            logger.error("email_send_failed", exc_info=r, extra={"event_id": event_id, "email_type": m[0], "to": m[1]})
+
+    if await asyncio.to_thread(_record_offer_results, db, event_id, offer, results, claim_ts):
+        log_evt("info", "offer_sent", event_id=event_id, email_type="offer", recipient=offer["recipient"])
+    else:
+        log_evt("error", "offer_failed", event_id=event_id, email_type="offer")
+
 
-        # offer email
+async def send_offer_task(event_id: int) -> None:
+    """BackgroundTasks entry point for send_offer_flow.
+
+    Runs after the response is sent, so it opens its own session instead of
+    reusing the (already closed) request session.
+    """
+    db = SessionLocal()
+    try:
+        await send_offer_flow(event_id, db)
+    except Exception:
+        logger.exception("EMAIL SEND FAILED")
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+async def redrive_unsent_offers() -> None:
+    """Scheduled retry for offers that never went out.
+
+    Picks up failed sends (claim reverted) and claims lost mid-send (claimed
+    over _STALE_CLAIM ago with no sent offer logged). Only emails without a
+    "sent" EmailLog row are retried, and an event is dropped after
+    _REDRIVE_MAX_FAILED_SENDS failed sends or once it leaves _REDRIVE_WINDOW.
+    """
+    db = SessionLocal()
+    try:
+        now = utcnow()
+        stmt = (
+            select(Event.id)
+            .where(
+                Event.status == "pending",
+                or_(Event.offer_sent_at.is_(None), (Event.offer_sent_at <= now - _STALE_CLAIM) & ~_OFFER_SENT),
+                Event.created_at <= now - _REDRIVE_AFTER,
+                Event.created_at >= now - _REDRIVE_WINDOW,
+                _OFFER_FAILED_SENDS < _REDRIVE_MAX_FAILED_SENDS,
+            )
+            .order_by(Event.id)
+            .limit(_REDRIVE_BATCH)
+        )
+        event_ids = await asyncio.to_thread(lambda: db.execute(stmt).scalars().all())
+        for event_id in event_ids:
+            try:
+                await send_offer_flow(event_id, db)
+            except Exception:
+                logger.exception("offer redrive failed", extra={"event_id": event_id})
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+def resend_offer_flow(e: Event, db: Session) -> bool:
+    """Resend the offer (admin action); returns False when skipped.
+
+    Idempotency: prevent duplicate sends from retries / double-clicks using:
+    - per-event Postgres advisory lock (best-effort)
+    - short-window dedupe via EmailLog
+    """
+    # Best-effort per-event lock (Postgres only). If not acquired, skip quietly.
+    lock_key = 900000 + int(e.id)
+    lock_acquired = False
+    if not IS_SQLITE:
+        try:
+            lock_acquired = bool(db.execute(_TRY_LOCK_SQL, {"k": lock_key}).scalar())
+            if not lock_acquired:
+                log_evt("info", "resend_skipped", event_id=e.id, email_type="resend_offer", reason="lock_not_acquired")
+                return False
+        except Exception:
+            # safer to skip than to risk duplicate sends
+            log_evt("error", "resend_skipped", event_id=e.id, email_type="resend_offer", reason="lock_error")
+            return False
+
+    try:
+        now = utcnow()
+        # Short-window dedupe (60s)
+        cutoff = now - timedelta(seconds=60)
+        recent = (
+            db.query(EmailLog.id)
+            .filter(EmailLog.event_id == e.id, EmailLog.email_type == "resend_offer", EmailLog.created_at >= cutoff)
+            .first()
+        )
+        if recent:
+            log_evt("info", "resend_skipped", event_id=e.id, email_type="resend_offer", reason="recent_dedupe")
+            return False
+
+        # Send without touching offer_sent_at; this is an explicit resend.
         offer_recipient = CATERING_TEAM_EMAIL if TEST_MODE else e.email
         subject_offer = f"Ponuda – {e.first_name} {e.last_name}{' (TEST)' if TEST_MODE else ''}"
-        body_offer = render_offer_html(e)
-        if db is not None:
-            send_email_logged(db, e.id, "offer", offer_recipient, subject_offer, body_offer)
-        else:
-            send_email(offer_recipient, subject_offer, body_offer)
+        body_offer = e.offer_html or render_offer_html(e)
+        send_email_logged(db, e.id, "resend_offer", offer_recipient, subject_offer, body_offer)
 
-        if db is not None:
-            now = datetime.utcnow()
-            # Keep these resets for the reminder flow
-            e.last_email_sent_at = now
-            e.reminder_count = 0
-            e.reminder_3d_sent_at = None
-            e.reminder_7d_sent_at = None
-            e.updated_at = now
-            db.commit()
+        e.last_email_sent_at = now
+        e.updated_at = now
+        db.commit()
 
-        log_evt("info", "offer_sent", event_id=e.id, email_type="offer", recipient=offer_recipient)
+        log_evt("info", "resend_sent", event_id=e.id, email_type="resend_offer", recipient=offer_recipient)
+        return True
 
-    except Exception:
-        # If we claimed but failed to send, revert claim so the system can retry safely.
-        if db is not None and claim_ts is not None:
+    finally:
+        if lock_acquired:
             try:
-                db.execute(
-                    text(
-                        "UPDATE events SET offer_sent_at=NULL "
-                        "WHERE id=:id AND offer_sent_at=:ts"
-                    ),
-                    {"id": e.id, "ts": claim_ts},
-                )
+                db.execute(_UNLOCK_SQL, {"k": lock_key})
                 db.commit()
             except Exception:
-                try:
-                    db.rollback()
-                except Exception:
-                    pass
-        log_evt("error", "offer_failed", event_id=e.id, email_type="offer")
-        raise
+                pass
+
+
+def resend_offer_task(event_id: int) -> None:
+    """BackgroundTasks entry point for resend_offer_flow (own session)."""
+    db = SessionLocal()
+    try:
+        e = db.get(Event, event_id, options=_NO_LAZY)
+        if e is None:
+            return
+        resend_offer_flow(e, db)
+    except Exception:
+        logger.exception("resend_offer_task failed", extra={"event_id": event_id})
+    finally:
+        db.close()
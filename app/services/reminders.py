@@ -1,6 +1,8 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta
 
-from sqlalchemy import text
+from sqlalchemy import bindparam, func, insert, select, text
+from sqlalchemy.orm import Session, load_only, raiseload
 
 from app.core.config import (
     CATERING_TEAM_EMAIL,
@@ -8,12 +10,69 @@ from app.core.config import (
     REMINDER_DAY_2,
     TEST_MODE,
 )
+from app.core.clock import utcnow
 from app.core.logging import logger, log_evt
-from app.db.models import Event
-from app.db.session import SessionLocal, engine
-from app.email.sender import send_email_logged
+from app.db.models import EmailLog, Event
+from app.db.session import SessionLocal
+from app.email.sender import email_log_values_for_result, send_email_batch_async, send_email_logged
 from app.email.templates import reminder_email_body, event_2d_email_body
 
+OFFER_REMINDER_SUBJECT = "Podsjetnik — Landsky ponuda"
+EVENT_2D_SUBJECT = "Podsjetnik — događaj za 2 dana"
+
+# Sent-at column per reminder kind; offer reminders also bump reminder_count.
+_SENT_AT_FIELD = {
+    "offer_3d": "reminder_3d_sent_at",
+    "offer_7d": "reminder_7d_sent_at",
+    "event_2d": "event_2d_sent_at",
+}
+_COUNTS_REMINDER = {"offer_3d", "offer_7d"}
+
+# Per-kind claims over a locked batch; the IS NULL guard keeps them idempotent and
+# RETURNING reports only the rows this run actually claimed.
+# Built from one template (column names come from the fixed map above).
+_CLAIM_SQL = {
+    kind: text(
+        f"UPDATE events SET {col}=:now, last_email_sent_at=:now, "
+        + ("reminder_count=COALESCE(reminder_count,0)+1, " if kind in _COUNTS_REMINDER else "")
+        + f"updated_at=:now WHERE id IN :ids AND {col} IS NULL RETURNING id"
+    ).bindparams(bindparam("ids", expanding=True))
+    for kind, col in _SENT_AT_FIELD.items()
+}
+
+# Max rows claimed per kind per pass; anything left over is picked up next run.
+_CLAIM_BATCH = 200
+
+# Everything the reminder templates + recipient routing read; skips message/offer_html.
+_REMINDER_COLUMNS = (
+    Event.id,
+    Event.token,
+    Event.first_name,
+    Event.last_name,
+    Event.wedding_date,
+    Event.venue,
+    Event.email,
+)
+
+_REMINDER_LOAD_OPTIONS = (load_only(*_REMINDER_COLUMNS), raiseload("*"))
+_REMINDER_EVENT_STMT = select(Event).options(*_REMINDER_LOAD_OPTIONS)
+
+_SENT_AT_COLUMN = {kind: getattr(Event, col) for kind, col in _SENT_AT_FIELD.items()}
+
+# Revert a claim after a failed send so the next run can retry.
+_REVERT_SQL = {
+    kind: text(
+        f"UPDATE events SET {col}=NULL"
+        + (
+            ", reminder_count=CASE WHEN reminder_count>0 THEN reminder_count-1 ELSE 0 END"
+            if kind in _COUNTS_REMINDER
+            else ""
+        )
+        + f" WHERE id=:id AND {col}=:ts"
+    )
+    for kind, col in _SENT_AT_FIELD.items()
+}
+
 
 def get_reminder_recipient(e: Event, kind: str) -> str:
     """Routing rules:
@@ -28,160 +87,144 @@ def get_reminder_recipient(e: Event, kind: str) -> str:
     return e.email
 
 
-def reminder_job():
-    """Hourly reminders with idempotency + Postgres advisory lock."""
+def send_manual_reminder_task(event_id: int) -> None:
+    """Manual reminder (admin action), run as a background task with its own session."""
     db = SessionLocal()
-    lock_acquired = False
     try:
-        now = datetime.utcnow()
+        e = db.get(Event, event_id, options=_REMINDER_LOAD_OPTIONS)
+        if e is None:
+            return
+        recipient = CATERING_TEAM_EMAIL if TEST_MODE else e.email
+        send_email_logged(db, e.id, "manual_reminder", recipient, OFFER_REMINDER_SUBJECT, reminder_email_body(e))
 
-        # Prevent duplicate scheduler runs (Postgres only)
-        if not ("sqlite" in str(engine.url)):
-            try:
-                lock_acquired = bool(
-                    db.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": 927341}).scalar()
-                )
-                if not lock_acquired:
-                    log_evt("info", "reminder_job_skipped", reason="lock_not_acquired")
-                    return
-            except Exception:
-                # Safer to skip than to risk duplicate sends.
-                logger.exception("reminder_job: advisory lock error")
-                log_evt("error", "reminder_job_skipped", reason="lock_error")
-                return
+        now = utcnow()
+        e.last_email_sent_at = now
+        e.updated_at = now
+        db.commit()
+        log_evt("info", "manual_reminder_sent", event_id=event_id, email_type="manual_reminder", recipient=recipient)
+    except Exception:
+        logger.exception("manual_reminder failed", extra={"event_id": event_id})
+    finally:
+        db.close()
 
-        # 1) Offer reminders (pending)
-        pending = db.query(Event).filter(Event.status == "pending").all()
-        for e in pending:
-            base = e.offer_sent_at or e.last_email_sent_at
-            if not base:
-                continue
-
-            # 3-day reminder
-            if e.reminder_3d_sent_at is None and (now - base).days >= REMINDER_DAY_1:
-                claim_ts = now
-                res = db.execute(
-                    text(
-                        "UPDATE events SET reminder_3d_sent_at=:now, last_email_sent_at=:now, "
-                        "reminder_count=COALESCE(reminder_count,0)+1, updated_at=:now "
-                        "WHERE id=:id AND reminder_3d_sent_at IS NULL"
-                    ),
-                    {"now": claim_ts, "id": e.id},
-                )
-                db.commit()
-                if res.rowcount == 1:
-                    try:
-                        send_email_logged(
-                            db,
-                            e.id,
-                            "offer_3d",
-                            get_reminder_recipient(e, "offer_3d"),
-                            "Podsjetnik — Landsky ponuda",
-                            reminder_email_body(e),
-                        )
-                        log_evt("info", "reminder_sent", event_id=e.id, email_type="offer_3d")
-                    except Exception:
-                        logger.exception("reminder_job: send failed (offer_3d)", extra={"event_id": e.id})
-                        # revert claim so it can retry
-                        try:
-                            db.execute(
-                                text(
-                                    "UPDATE events SET reminder_3d_sent_at=NULL, "
-                                    "reminder_count=CASE WHEN reminder_count>0 THEN reminder_count-1 ELSE 0 END "
-                                    "WHERE id=:id AND reminder_3d_sent_at=:ts"
-                                ),
-                                {"id": e.id, "ts": claim_ts},
-                            )
-                            db.commit()
-                        except Exception:
-                            db.rollback()
-                        log_evt("error", "reminder_failed", event_id=e.id, email_type="offer_3d")
-
-            # 7-day reminder
-            if e.reminder_7d_sent_at is None and (now - base).days >= REMINDER_DAY_2:
-                claim_ts = now
-                res = db.execute(
-                    text(
-                        "UPDATE events SET reminder_7d_sent_at=:now, last_email_sent_at=:now, "
-                        "reminder_count=COALESCE(reminder_count,0)+1, updated_at=:now "
-                        "WHERE id=:id AND reminder_7d_sent_at IS NULL"
-                    ),
-                    {"now": claim_ts, "id": e.id},
-                )
-                db.commit()
-                if res.rowcount == 1:
-                    try:
-                        send_email_logged(
-                            db,
-                            e.id,
-                            "offer_7d",
-                            get_reminder_recipient(e, "offer_7d"),
-                            "Podsjetnik — Landsky ponuda",
-                            reminder_email_body(e),
-                        )
-                        log_evt("info", "reminder_sent", event_id=e.id, email_type="offer_7d")
-                    except Exception:
-                        logger.exception("reminder_job: send failed (offer_7d)", extra={"event_id": e.id})
-                        try:
-                            db.execute(
-                                text(
-                                    "UPDATE events SET reminder_7d_sent_at=NULL, "
-                                    "reminder_count=CASE WHEN reminder_count>0 THEN reminder_count-1 ELSE 0 END "
-                                    "WHERE id=:id AND reminder_7d_sent_at=:ts"
-                                ),
-                                {"id": e.id, "ts": claim_ts},
-                            )
-                            db.commit()
-                        except Exception:
-                            db.rollback()
-                        log_evt("error", "reminder_failed", event_id=e.id, email_type="offer_7d")
 
+def _claim(db: Session, kind: str, due, now: datetime) -> list[int]:
+    """Lock and flag due rows; returns only the ids this call claimed.
+
+    Rows locked by a concurrent run are skipped. FOR UPDATE SKIP LOCKED is a
+    no-op on SQLite, and a READ COMMITTED re-read can still see rows another run
+    just claimed, so the guarded UPDATE decides and its RETURNING ids are used.
+    """
+    ids = (
+        db.execute(
+            select(Event.id)
+            .where(due, _SENT_AT_COLUMN[kind].is_(None))
+            .order_by(Event.id)
+            .limit(_CLAIM_BATCH)
+            .with_for_update(skip_locked=True)
+        )
+        .scalars()
+        .all()
+    )
+    if not ids:
+        return []
+    return sorted(db.execute(_CLAIM_SQL[kind], {"now": now, "ids": ids}).scalars())
+
+
+def _claim_due_reminders(db: Session, now: datetime) -> list[dict]:
+    """Claim every due reminder (one transaction) and render its email.
+
+    Due-ness is decided in SQL against cutoffs computed once per pass.
+    Bodies are rendered here (in the worker thread) so nothing touches the
+    ORM once the sends are running on the event loop.
+    """
+    offer_base = func.coalesce(Event.offer_sent_at, Event.last_email_sent_at)
+    due = {
+        # 1) Offer reminders (pending)
+        "offer_3d": (Event.status == "pending") & (offer_base <= now - timedelta(days=REMINDER_DAY_1)),
+        "offer_7d": (Event.status == "pending") & (offer_base <= now - timedelta(days=REMINDER_DAY_2)),
         # 2) Event 2-day reminders (accepted only)
-        accepted = db.query(Event).filter(Event.status == "accepted").all()
-        for e in accepted:
-            if e.event_2d_sent_at is not None:
-                continue
-            days_until = (e.wedding_date - now.date()).days
-            if days_until <= 2:
-                claim_ts = now
-                res = db.execute(
-                    text(
-                        "UPDATE events SET event_2d_sent_at=:now, last_email_sent_at=:now, updated_at=:now "
-                        "WHERE id=:id AND event_2d_sent_at IS NULL"
-                    ),
-                    {"now": claim_ts, "id": e.id},
+        "event_2d": (Event.status == "accepted") & (Event.wedding_date <= now.date() + timedelta(days=2)),
+    }
+
+    try:
+        claimed_ids = {kind: _claim(db, kind, cond, now) for kind, cond in due.items()}
+        all_ids = {event_id for ids in claimed_ids.values() for event_id in ids}
+        events = {}
+        if all_ids:
+            rows = db.execute(_REMINDER_EVENT_STMT.where(Event.id.in_(all_ids))).scalars()
+            events = {e.id: e for e in rows}
+
+        claimed = []
+        for kind, ids in claimed_ids.items():
+            for event_id in ids:
+                e = events[event_id]
+                if kind == "event_2d":
+                    subject, body_html = EVENT_2D_SUBJECT, event_2d_email_body(e)
+                else:
+                    subject, body_html = OFFER_REMINDER_SUBJECT, reminder_email_body(e)
+                claimed.append(
+                    {
+                        "kind": kind,
+                        "event_id": event_id,
+                        "to_email": get_reminder_recipient(e, kind),
+                        "subject": subject,
+                        "body_html": body_html,
+                    }
                 )
-                db.commit()
-                if res.rowcount == 1:
-                    try:
-                        send_email_logged(
-                            db,
-                            e.id,
-                            "event_2d",
-                            get_reminder_recipient(e, "event_2d"),
-                            "Podsjetnik — događaj za 2 dana",
-                            event_2d_email_body(e),
-                        )
-                        log_evt("info", "reminder_sent", event_id=e.id, email_type="event_2d")
-                    except Exception:
-                        logger.exception("reminder_job: send failed (event_2d)", extra={"event_id": e.id})
-                        try:
-                            db.execute(
-                                text("UPDATE events SET event_2d_sent_at=NULL WHERE id=:id AND event_2d_sent_at=:ts"),
-                                {"id": e.id, "ts": claim_ts},
-                            )
-                            db.commit()
-                        except Exception:
-                            db.rollback()
-                        log_evt("error", "reminder_failed", event_id=e.id, email_type="event_2d")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return claimed
+
+
+def _record_results(db: Session, claimed: list[dict], results: list, claim_ts: datetime) -> None:
+    """Write the pass's EmailLog rows and revert failed claims in one transaction."""
+    log_rows = []
+    reverts = {}
+    for job, result in zip(claimed, results):
+        kind, event_id = job["kind"], job["event_id"]
+        log_rows.append(email_log_values_for_result(event_id, kind, job["to_email"], job["subject"], result))
+        if isinstance(result, BaseException):
+            logger.error(f"reminder_job: send failed ({kind})", exc_info=result, extra={"event_id": event_id})
+            # revert claim so it can retry
+            reverts.setdefault(kind, []).append({"id": event_id, "ts": claim_ts})
+
+    try:
+        db.execute(insert(EmailLog), log_rows)
+        for kind, params in reverts.items():
+            db.execute(_REVERT_SQL[kind], params)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("reminder_job: result write failed", extra={"count": len(log_rows)})
+
+    for job, result in zip(claimed, results):
+        if isinstance(result, BaseException):
+            log_evt("error", "reminder_failed", event_id=job["event_id"], email_type=job["kind"])
+        else:
+            log_evt("info", "reminder_sent", event_id=job["event_id"], email_type=job["kind"])
+
+
+async def reminder_job():
+    """Hourly reminders with idempotent, row-locked claims.
+
+    Concurrent runs (other workers/replicas) claim disjoint events via
+    SELECT ... FOR UPDATE SKIP LOCKED. DB work runs in a worker thread
+    (sync SQLAlchemy); the claimed emails are then sent concurrently on the
+    event loop.
+    """
+    db = SessionLocal()
+    try:
+        now = utcnow()
+
+        claimed = await asyncio.to_thread(_claim_due_reminders, db, now)
+        if not claimed:
+            return
+
+        results = await send_email_batch_async([(job["to_email"], job["subject"], job["body_html"]) for job in claimed])
+        await asyncio.to_thread(_record_results, db, claimed, results, now)
 
     finally:
-        try:
-            if lock_acquired and not ("sqlite" in str(engine.url)):
-                try:
-                    db.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": 927341})
-                    db.commit()
-                except Exception:
-                    db.rollback()
-        finally:
-            db.close()
+        await asyncio.to_thread(db.close)
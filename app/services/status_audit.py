@@ -1,9 +1,8 @@
-from datetime import datetime
-
 from fastapi import Request
 from sqlalchemy.orm import Session
 
-from app.db.models import Event, StatusChangeLog
+from app.core.clock import utcnow
+from app.db.models import StatusChangeLog
 
 
 def _client_ip(request: Request | None) -> str | None:
@@ -19,7 +18,7 @@ def _client_ip(request: Request | None) -> str | None:
 
 def log_status_change(
     db: Session,
-    event: Event,
+    event_id: int,
     old_status: str | None,
     new_status: str | None,
     source: str,
@@ -30,7 +29,7 @@ def log_status_change(
         return
 
     row = StatusChangeLog(
-        event_id=event.id,
+        event_id=event_id,
         old_status=old_status,
         new_status=new_status,
         source=source,
@@ -38,6 +37,6 @@ def log_status_change(
         actor_ip=_client_ip(request),
         actor_user_agent=(request.headers.get("user-agent") if request is not None else None),
         actor_auth=(request.headers.get("authorization", "")[:32] if request is not None else None),
-        created_at=datetime.utcnow(),
+        created_at=utcnow(),
     )
     db.add(row)
@@ -0,0 +1,70 @@
+import importlib
+import sys
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+@pytest.fixture
+def app_env(tmp_path, monkeypatch):
+    """Fresh app.* import against an empty SQLite database (config is read at import)."""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/test.db")
+    monkeypatch.setenv("EMAIL_PROVIDER", "resend")
+    monkeypatch.setenv("TEST_MODE", "0")
+    monkeypatch.setenv("REMINDERS_ENABLED", "0")
+    monkeypatch.setenv("OFFER_REDRIVE_ENABLED", "0")
+    monkeypatch.setenv("ADMIN_USER", "admin")
+    monkeypatch.setenv("ADMIN_PASSWORD", "secret")
+    monkeypatch.chdir(REPO_ROOT)  # StaticFiles / admin.html use repo-relative paths
+
+    for mod in [m for m in list(sys.modules) if m == "app" or m.startswith("app.")]:
+        sys.modules.pop(mod, None)
+
+    main = importlib.import_module("app.main")
+    models = importlib.import_module("app.db.models")
+    session = importlib.import_module("app.db.session")
+    models.Base.metadata.create_all(bind=session.engine)
+
+    yield SimpleNamespace(
+        app=main.app,
+        admin=importlib.import_module("app.api.routers.admin"),
+        models=models,
+        SessionLocal=session.SessionLocal,
+        offers=importlib.import_module("app.services.offers"),
+        reminders=importlib.import_module("app.services.reminders"),
+        sender=importlib.import_module("app.email.sender"),
+    )
+    session.engine.dispose()
+
+
+@pytest.fixture
+def make_event(app_env):
+    counter = iter(range(1, 10_000))
+
+    def _make(**overrides) -> int:
+        n = next(counter)
+        values = {
+            "token": f"test-token-{n:06d}",
+            "first_name": "Ana",
+            "last_name": "Kovač",
+            "wedding_date": date(2030, 6, 15),
+            "venue": "Hotel Esplanade",
+            "guest_count": 120,
+            "email": f"couple{n}@example.com",
+            "phone": "123456789",
+            "status": "pending",
+        }
+        values.update(overrides)
+        with app_env.SessionLocal() as db:
+            e = app_env.models.Event(**values)
+            db.add(e)
+            db.commit()
+            return e.id
+
+    return _make
@@ -0,0 +1,158 @@
+import asyncio
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+
+from app.core.clock import utcnow
+
+AUTH = ("admin", "secret")
+
+
+def test_keyset_paging_walks_every_event_once(app_env, make_event):
+    ids = [make_event() for _ in range(5)]
+
+    seen = []
+    cursor = None
+    with TestClient(app_env.app) as client:
+        for _ in range(10):
+            params = {"id_sort": "asc", "limit": 2}
+            if cursor is not None:
+                params["after"] = cursor
+            r = client.get("/admin/api/events", params=params, auth=AUTH)
+            assert r.status_code == 200
+            body = r.json()
+            seen.extend(item["id"] for item in body["items"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+    assert seen == sorted(ids)
+    assert len(seen) == len(set(seen))
+
+
+def test_after_requires_id_sort(app_env):
+    with TestClient(app_env.app) as client:
+        r = client.get("/admin/api/events", params={"after": 1}, auth=AUTH)
+    assert r.status_code == 400
+
+
+def _state(app_env, event_id):
+    models = app_env.models
+    with app_env.SessionLocal() as db:
+        e = db.get(models.Event, event_id)
+        audit = [
+            (row.old_status, row.new_status, row.source)
+            for row in db.query(models.StatusChangeLog)
+            .filter(models.StatusChangeLog.event_id == event_id)
+            .order_by(models.StatusChangeLog.id)
+        ]
+        return e.status, e.accepted, e.selected_package, audit
+
+
+def test_set_status_back_to_pending_resets_acceptance_and_audits(app_env, make_event):
+    event_id = make_event(status="accepted", accepted=True, selected_package="premium")
+
+    with TestClient(app_env.app) as client:
+        r = client.post(f"/admin/api/events/{event_id}/status", json={"status": "pending"}, auth=AUTH)
+        dedicated = client.post(f"/admin/api/events/{event_id}/status", json={"status": "accepted"}, auth=AUTH)
+        missing = client.post("/admin/api/events/999/status", json={"status": "pending"}, auth=AUTH)
+
+    assert r.status_code == 200
+    assert dedicated.status_code == 400
+    assert missing.status_code == 404
+    assert _state(app_env, event_id) == ("pending", False, None, [("accepted", "pending", "admin_status_api")])
+
+
+def test_admin_accept_updates_and_audits(app_env, make_event):
+    event_id = make_event()
+
+    with TestClient(app_env.app) as client:
+        r = client.post(f"/admin/api/events/{event_id}/accept", auth=AUTH)
+        missing = client.post("/admin/api/events/999/accept", auth=AUTH)
+
+    assert r.status_code == 200
+    assert missing.status_code == 404
+    assert _state(app_env, event_id) == ("accepted", True, None, [("pending", "accepted", "admin_accept_api")])
+
+
+def test_admin_decline_checks_confirmation_then_updates_and_audits(app_env, make_event, monkeypatch):
+    monkeypatch.setattr(app_env.admin, "ALLOW_ADMIN_DECLINE", True)
+    event_id = make_event(token="admin-decline-0001", status="accepted", accepted=True, selected_package="classic")
+    url = f"/admin/api/events/{event_id}/decline"
+
+    with TestClient(app_env.app) as client:
+        wrong_text = client.post(url, json={"confirm_text": "yes", "event_token": "admin-decline-0001"}, auth=AUTH)
+        wrong_token = client.post(
+            url, json={"confirm_text": f"decline-{event_id}", "event_token": "other-token-00001"}, auth=AUTH
+        )
+        assert _state(app_env, event_id)[0] == "accepted"
+        ok = client.post(
+            url, json={"confirm_text": f"decline-{event_id}", "event_token": "admin-decline-0001"}, auth=AUTH
+        )
+
+    assert (wrong_text.status_code, wrong_token.status_code, ok.status_code) == (400, 400, 200)
+    assert _state(app_env, event_id) == ("declined", False, None, [("accepted", "declined", "admin_decline_api")])
+
+
+def test_admin_decline_is_disabled_by_default(app_env, make_event):
+    event_id = make_event(token="admin-decline-0002")
+
+    with TestClient(app_env.app) as client:
+        r = client.post(
+            f"/admin/api/events/{event_id}/decline",
+            json={"confirm_text": f"DECLINE-{event_id}", "event_token": "admin-decline-0002"},
+            auth=AUTH,
+        )
+
+    assert r.status_code == 403
+    assert _state(app_env, event_id)[0] == "pending"
+
+
+def test_next_reminder_matches_what_the_reminder_job_sends(app_env, make_event, monkeypatch):
+    now = utcnow()
+    today = now.date()
+    events = {
+        "offer_3d_due": make_event(offer_sent_at=now - timedelta(days=4)),
+        "offer_7d_due": make_event(offer_sent_at=now - timedelta(days=8), reminder_3d_sent_at=now - timedelta(days=5)),
+        "offer_3d_later": make_event(offer_sent_at=now - timedelta(days=1)),
+        "event_2d_due": make_event(status="accepted", accepted=True, wedding_date=today + timedelta(days=1)),
+        "event_2d_later": make_event(status="accepted", accepted=True, wedding_date=today + timedelta(days=30)),
+        "offers_done": make_event(
+            offer_sent_at=now - timedelta(days=10),
+            reminder_3d_sent_at=now - timedelta(days=7),
+            reminder_7d_sent_at=now - timedelta(days=3),
+        ),
+        "no_offer_yet": make_event(),
+        "declined": make_event(status="declined", offer_sent_at=now - timedelta(days=4)),
+    }
+
+    with TestClient(app_env.app) as client:
+        items = client.get("/admin/api/events", params={"id_sort": "asc"}, auth=AUTH).json()["items"]
+    by_id = {item["id"]: item for item in items}
+
+    def next_reminder(name):
+        item = by_id[events[name]]
+        return item["next_reminder_kind"], item["next_reminder_due"]
+
+    assert next_reminder("offer_3d_due") == ("offer_3d", (now - timedelta(days=1)).isoformat())
+    assert next_reminder("offer_7d_due") == ("offer_7d", (now - timedelta(days=1)).isoformat())
+    assert next_reminder("offer_3d_later") == ("offer_3d", (now + timedelta(days=2)).isoformat())
+    assert next_reminder("event_2d_due") == ("event_2d", (today - timedelta(days=1)).isoformat())
+    assert next_reminder("event_2d_later") == ("event_2d", (today + timedelta(days=28)).isoformat())
+    for name in ("offers_done", "no_offer_yet", "declined"):
+        assert next_reminder(name) == (None, None)
+
+    async def ok_batch(messages):
+        return ["id"] * len(messages)
+
+    monkeypatch.setattr(app_env.reminders, "send_email_batch_async", ok_batch)
+    asyncio.run(app_env.reminders.reminder_job())
+
+    with app_env.SessionLocal() as db:
+        sent = {(log.event_id, log.email_type) for log in db.query(app_env.models.EmailLog)}
+    # Exactly the events whose next reminder was already due, with the predicted kind.
+    assert sent == {
+        (events["offer_3d_due"], "offer_3d"),
+        (events["offer_7d_due"], "offer_7d"),
+        (events["event_2d_due"], "event_2d"),
+    }
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import timedelta
+
+from app.core.clock import utcnow
+
+
+def _offer_logs(app_env, event_id):
+    EmailLog = app_env.models.EmailLog
+    with app_env.SessionLocal() as db:
+        e = db.get(app_env.models.Event, event_id)
+        logs = db.query(EmailLog).filter(EmailLog.event_id == event_id).order_by(EmailLog.id).all()
+        return e, [(log.email_type, log.status, log.provider_message_id, log.error) for log in logs]
+
+
+def test_partial_batch_failure_logs_per_message_and_retries_only_the_failed_email(app_env, make_event, monkeypatch):
+    event_id = make_event()
+    calls = []
+
+    async def partial_batch(messages):
+        calls.append([m[0] for m in messages])
+        return ["id-internal", RuntimeError("address rejected")]
+
+    monkeypatch.setattr(app_env.offers, "send_email_batch_async", partial_batch)
+    asyncio.run(app_env.offers.send_offer_task(event_id))
+
+    e, logs = _offer_logs(app_env, event_id)
+    assert e.offer_sent_at is None  # claim reverted for the retry
+    assert logs == [
+        ("internal_new_inquiry", "sent", "id-internal", None),
+        ("offer", "failed", None, "address rejected"),
+    ]
+
+    async def ok_batch(messages):
+        calls.append([m[0] for m in messages])
+        return ["id-offer"] * len(messages)
+
+    monkeypatch.setattr(app_env.offers, "send_email_batch_async", ok_batch)
+    asyncio.run(app_env.offers.send_offer_task(event_id))
+
+    # The internal notification already went out; only the offer is retried.
+    assert calls[1] == ["couple1@example.com"]
+    e, logs = _offer_logs(app_env, event_id)
+    assert e.offer_sent_at is not None
+    assert logs[-1] == ("offer", "sent", "id-offer", None)
+
+
+def _add_log(app_env, event_id, email_type, status):
+    with app_env.SessionLocal() as db:
+        db.add(
+            app_env.models.EmailLog(
+                event_id=event_id, email_type=email_type, to_email="x@example.com", subject="s", status=status
+            )
+        )
+        db.commit()
+
+
+def _recording_batch(calls):
+    async def batch(messages):
+        calls.append([m[0] for m in messages])
+        return [f"id-{i}" for i in range(len(messages))]
+
+    return batch
+
+
+def test_redrive_does_not_resend_an_offer_delivered_by_admin_resend(app_env, make_event, monkeypatch):
+    event_id = make_event(created_at=utcnow() - timedelta(minutes=20))
+
+    async def failing_batch(messages):
+        return [RuntimeError("provider down")] * len(messages)
+
+    monkeypatch.setattr(app_env.offers, "send_email_batch_async", failing_batch)
+    asyncio.run(app_env.offers.send_offer_task(event_id))
+
+    # Admin resend goes out through the sync sender and logs "resend_offer".
+    monkeypatch.setattr(app_env.sender, "send_email", lambda to_email, subject, body_html: "id-resend")
+    app_env.offers.resend_offer_task(event_id)
+
+    calls = []
+    monkeypatch.setattr(app_env.offers, "send_email_batch_async", _recording_batch(calls))
+    asyncio.run(app_env.offers.redrive_unsent_offers())
+    asyncio.run(app_env.offers.redrive_unsent_offers())
+
+    # Only the internal notification is retried; the couple gets no second offer.
+    assert calls == [[app_env.offers.CATERING_TEAM_EMAIL]]
+    e, logs = _offer_logs(app_env, event_id)
+    assert e.offer_sent_at is not None
+    assert [log[:2] for log in logs if log[0] == "offer" or log[0] == "resend_offer"] == [
+        ("offer", "failed"),
+        ("resend_offer", "sent"),
+    ]
+
+
+def test_redrive_takes_over_only_stale_claims_without_a_sent_offer(app_env, make_event, monkeypatch):
+    now = utcnow()
+    created = now - timedelta(hours=2)
+    stale = make_event(created_at=created, offer_sent_at=now - timedelta(hours=1))
+    fresh = make_event(created_at=created, offer_sent_at=now - timedelta(minutes=5))
+    delivered = make_event(created_at=created, offer_sent_at=now - timedelta(hours=1))
+    _add_log(app_env, delivered, "offer", "sent")
+
+    calls = []
+    monkeypatch.setattr(app_env.offers, "send_email_batch_async", _recording_batch(calls))
+    asyncio.run(app_env.offers.redrive_unsent_offers())
+
+    assert calls == [[app_env.offers.CATERING_TEAM_EMAIL, "couple1@example.com"]]
+    e, logs = _offer_logs(app_env, stale)
+    assert e.offer_sent_at > now - timedelta(minutes=1)
+    assert [log[:2] for log in logs] == [("internal_new_inquiry", "sent"), ("offer", "sent")]
+    assert _offer_logs(app_env, fresh)[1] == []
+
+
+def test_redrive_gives_up_after_max_failed_sends(app_env, make_event, monkeypatch):
+    created = utcnow() - timedelta(minutes=20)
+    capped = make_event(created_at=created)
+    retried = make_event(created_at=created)
+    for _ in range(app_env.offers._REDRIVE_MAX_FAILED_SENDS):
+        _add_log(app_env, capped, "offer", "failed")
+    for _ in range(app_env.offers._REDRIVE_MAX_FAILED_SENDS - 1):
+        _add_log(app_env, retried, "offer", "failed")
+
+    calls = []
+    monkeypatch.setattr(app_env.offers, "send_email_batch_async", _recording_batch(calls))
+    asyncio.run(app_env.offers.redrive_unsent_offers())
+
+    assert calls == [[app_env.offers.CATERING_TEAM_EMAIL, "couple2@example.com"]]
+    assert _offer_logs(app_env, capped)[0].offer_sent_at is None
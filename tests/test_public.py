@@ -0,0 +1,95 @@
+from fastapi.testclient import TestClient
+
+
+def test_offer_preview_returns_304_for_matching_etag(app_env, make_event):
+    make_event(token="preview-token-0001", offer_html="<p>Ponuda</p>")
+
+    with TestClient(app_env.app) as client:
+        first = client.get("/offer-preview", params={"token": "preview-token-0001"})
+        assert first.status_code == 200
+        assert first.text == "<p>Ponuda</p>"
+        etag = first.headers["etag"]
+
+        again = client.get(
+            "/offer-preview", params={"token": "preview-token-0001"}, headers={"If-None-Match": etag}
+        )
+        assert again.status_code == 304
+        assert again.headers["etag"] == etag
+        assert again.content == b""
+
+
+def test_offer_preview_rejects_malformed_token(app_env):
+    with TestClient(app_env.app) as client:
+        assert client.get("/offer-preview", params={"token": "x' OR 1=1"}).status_code == 404
+
+
+def _state(app_env, event_id):
+    models = app_env.models
+    with app_env.SessionLocal() as db:
+        e = db.get(models.Event, event_id)
+        audit = [
+            (row.old_status, row.new_status, row.source)
+            for row in db.query(models.StatusChangeLog).filter(models.StatusChangeLog.event_id == event_id)
+        ]
+        return e.status, e.accepted, e.selected_package, audit
+
+
+def test_accept_confirm_accepts_once_and_reports_the_first_choice(app_env, make_event):
+    event_id = make_event(token="accept-token-0001")
+
+    with TestClient(app_env.app) as client:
+        first = client.post("/accept/confirm", data={"token": "accept-token-0001", "package": "Premium"})
+        again = client.post("/accept/confirm", data={"token": "accept-token-0001", "package": "classic"})
+
+    assert first.status_code == 200
+    assert "Ponuda je prihvaćena" in first.text and "<b>Premium</b>" in first.text
+    # Already accepted: same reply with the package chosen first, nothing rewritten.
+    assert again.status_code == 200
+    assert "<b>Premium</b>" in again.text
+    assert _state(app_env, event_id) == ("accepted", True, "premium", [("pending", "accepted", "guest_accept_post")])
+
+
+def test_accept_confirm_on_declined_event_changes_nothing(app_env, make_event):
+    event_id = make_event(token="accept-token-0002", status="declined")
+
+    with TestClient(app_env.app) as client:
+        r = client.post("/accept/confirm", data={"token": "accept-token-0002", "package": "classic"})
+
+    assert r.status_code == 200
+    assert "Ponuda je već odbijena" in r.text
+    assert _state(app_env, event_id) == ("declined", False, None, [])
+
+
+def test_accept_confirm_rejects_unknown_token_and_package(app_env, make_event):
+    make_event(token="accept-token-0003")
+
+    with TestClient(app_env.app) as client:
+        unknown = client.post("/accept/confirm", data={"token": "no-such-token-0000", "package": "classic"})
+        bad_package = client.post("/accept/confirm", data={"token": "accept-token-0003", "package": "gold"})
+
+    assert unknown.status_code == 404
+    assert bad_package.status_code == 400
+
+
+def test_decline_confirm_declines_once(app_env, make_event):
+    event_id = make_event(token="decline-token-0001")
+
+    with TestClient(app_env.app) as client:
+        first = client.post("/decline/confirm", data={"token": "decline-token-0001"})
+        again = client.post("/decline/confirm", data={"token": "decline-token-0001"})
+        unknown = client.post("/decline/confirm", data={"token": "no-such-token-0000"})
+
+    assert first.status_code == 200 and "Ponuda odbijena" in first.text
+    assert again.status_code == 200 and "Ponuda je već odbijena" in again.text
+    assert unknown.status_code == 404
+    assert _state(app_env, event_id)[:2] == ("declined", False)
+
+
+def test_decline_confirm_clears_accepted_flag(app_env, make_event):
+    event_id = make_event(token="decline-token-0002", status="accepted", accepted=True)
+
+    with TestClient(app_env.app) as client:
+        r = client.post("/decline/confirm", data={"token": "decline-token-0002"})
+
+    assert "Ponuda odbijena" in r.text
+    assert _state(app_env, event_id)[:2] == ("declined", False)
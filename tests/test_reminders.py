@@ -0,0 +1,56 @@
+import asyncio
+from datetime import timedelta
+
+from app.core.clock import utcnow
+
+
+def _due_offer_reminder(make_event):
+    # offer_3d is due, offer_7d is not (REMINDER_DAY_1=3, REMINDER_DAY_2=7)
+    return make_event(offer_sent_at=utcnow() - timedelta(days=4), reminder_count=0)
+
+
+def _load(app_env, event_id):
+    with app_env.SessionLocal() as db:
+        e = db.get(app_env.models.Event, event_id)
+        logs = (
+            db.query(app_env.models.EmailLog)
+            .filter(app_env.models.EmailLog.event_id == event_id)
+            .order_by(app_env.models.EmailLog.id)
+            .all()
+        )
+        return e, logs
+
+
+def test_failed_send_reverts_claim_and_reminder_count(app_env, make_event, monkeypatch):
+    event_id = _due_offer_reminder(make_event)
+
+    async def failing_batch(messages):
+        return [RuntimeError("smtp down")] * len(messages)
+
+    monkeypatch.setattr(app_env.reminders, "send_email_batch_async", failing_batch)
+    asyncio.run(app_env.reminders.reminder_job())
+
+    e, logs = _load(app_env, event_id)
+    assert e.reminder_3d_sent_at is None
+    assert e.reminder_count == 0
+    assert [(log.email_type, log.status, log.error) for log in logs] == [("offer_3d", "failed", "smtp down")]
+
+
+def test_second_run_sends_nothing(app_env, make_event, monkeypatch):
+    event_id = _due_offer_reminder(make_event)
+    sent = []
+
+    async def ok_batch(messages):
+        sent.append(list(messages))
+        return [f"msg-{i}" for i in range(len(messages))]
+
+    monkeypatch.setattr(app_env.reminders, "send_email_batch_async", ok_batch)
+    asyncio.run(app_env.reminders.reminder_job())
+    asyncio.run(app_env.reminders.reminder_job())
+
+    assert len(sent) == 1
+    assert [m[0] for m in sent[0]] == ["couple1@example.com"]
+    e, logs = _load(app_env, event_id)
+    assert e.reminder_3d_sent_at is not None
+    assert e.reminder_count == 1
+    assert [(log.email_type, log.status) for log in logs] == [("offer_3d", "sent")]
@@ -0,0 +1,30 @@
+import base64
+
+import pytest
+from fastapi.testclient import TestClient
+
+GOOD = base64.b64encode(b"admin:secret").decode("ascii")
+BAD = base64.b64encode(b"admin:wrong").decode("ascii")
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (f"Basic {GOOD}", 200),
+        (f"basic {GOOD}", 200),
+        (f"BASIC {GOOD}", 200),
+        (f"Basic  {GOOD} ", 200),
+        (f"Basic {BAD}", 401),
+        (f"Bearer {GOOD}", 401),
+        (GOOD, 401),
+        ("", 401),
+    ],
+)
+def test_admin_page_and_api_agree_on_basic_auth(app_env, header, expected):
+    headers = {"Authorization": header} if header else {}
+    with TestClient(app_env.app) as client:
+        page = client.get("/admin", headers=headers)
+        api = client.get("/admin/api/events", headers=headers)
+
+    assert page.status_code == expected
+    assert api.status_code == expected
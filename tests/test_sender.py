@@ -0,0 +1,49 @@
+import asyncio
+
+import httpx
+import pytest
+
+
+def _batch_error(sender, status):
+    async def batch(messages):
+        request = httpx.Request("POST", sender.RESEND_BATCH_URL)
+        raise httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+    return batch
+
+
+def test_rejected_resend_batch_falls_back_to_single_sends(app_env, monkeypatch):
+    sender = app_env.sender
+    monkeypatch.setattr(sender, "_RESEND_REQUEST_INTERVAL", 0)
+
+    async def single(to_email, subject, body_html):
+        if to_email == "bad":
+            raise RuntimeError("invalid to")
+        return f"id-{to_email}"
+
+    monkeypatch.setattr(sender, "_send_resend_batch_async", _batch_error(sender, 422))
+    monkeypatch.setattr(sender, "send_email_resend_async", single)
+
+    results = asyncio.run(sender.send_email_batch_async([("a", "s", "b"), ("bad", "s", "b"), ("c", "s", "b")]))
+
+    assert results[0] == "id-a"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == "id-c"
+
+
+@pytest.mark.parametrize("status", [401, 403, 413, 429, 500])
+def test_non_validation_batch_error_fails_the_chunk_without_single_sends(app_env, monkeypatch, status):
+    sender = app_env.sender
+    singles = []
+
+    async def single(to_email, subject, body_html):
+        singles.append(to_email)
+        return "id"
+
+    monkeypatch.setattr(sender, "_send_resend_batch_async", _batch_error(sender, status))
+    monkeypatch.setattr(sender, "send_email_resend_async", single)
+
+    results = asyncio.run(sender.send_email_batch_async([("a", "s", "b"), ("c", "s", "b")]))
+
+    assert singles == []
+    assert [r.response.status_code for r in results] == [status, status]
@@ -0,0 +1,115 @@
+import asyncio
+import smtplib
+import threading
+import time
+
+import pytest
+
+
+class FakeSMTP:
+    instances = []
+
+    def __init__(self, host, port, timeout=None, context=None):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.sent = []
+        self.logins = 0
+        self.quit_called = False
+        self.alive = True
+        self.fail_send = False
+        FakeSMTP.instances.append(self)
+
+    def login(self, user, password):
+        self.logins += 1
+
+    def noop(self):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected("gone")
+        return (250, b"OK")
+
+    def sendmail(self, sender, recipients, msg):
+        if self.fail_send:
+            raise smtplib.SMTPRecipientsRefused({recipients[0]: (550, b"no")})
+        self.sent.append(recipients[0])
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def sender(app_env, monkeypatch):
+    FakeSMTP.instances = []
+    monkeypatch.setattr(smtplib, "SMTP_SSL", FakeSMTP)
+    monkeypatch.setattr(app_env.sender, "SMTP_HOST", "smtp.example.com")
+    monkeypatch.setattr(app_env.sender, "SMTP_USER", "catering@example.com")
+    yield app_env.sender
+    app_env.sender.close_smtp_pool()
+
+
+def test_sends_reuse_one_authenticated_connection(sender):
+    sender.send_email_smtp("a@example.com", "s", "<p>a</p>")
+    sender.send_email_smtp("b@example.com", "s", "<p>b</p>")
+
+    assert len(FakeSMTP.instances) == 1
+    conn = FakeSMTP.instances[0]
+    assert conn.logins == 1
+    assert conn.sent == ["a@example.com", "b@example.com"]
+    assert not conn.quit_called
+    assert conn.timeout == sender._SMTP_TIMEOUT
+
+
+def test_dead_connection_is_replaced(sender):
+    sender.send_email_smtp("a@example.com", "s", "<p>a</p>")
+    FakeSMTP.instances[0].alive = False
+
+    sender.send_email_smtp("b@example.com", "s", "<p>b</p>")
+
+    old, new = FakeSMTP.instances
+    assert old.quit_called
+    assert new.sent == ["b@example.com"]
+
+
+def test_failed_send_discards_the_connection(sender):
+    sender.send_email_smtp("a@example.com", "s", "<p>a</p>")
+    FakeSMTP.instances[0].fail_send = True
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        sender.send_email_smtp("bad@example.com", "s", "<p>x</p>")
+    sender.send_email_smtp("c@example.com", "s", "<p>c</p>")
+
+    old, new = FakeSMTP.instances
+    assert old.quit_called
+    assert new.sent == ["c@example.com"]
+
+
+def test_close_smtp_pool_quits_idle_connections(sender):
+    sender.send_email_smtp("a@example.com", "s", "<p>a</p>")
+    sender.close_smtp_pool()
+
+    assert FakeSMTP.instances[0].quit_called
+    assert sender._smtp_pool.empty()
+
+
+def test_concurrent_smtp_batches_share_one_process_wide_limit(app_env, monkeypatch):
+    sender = app_env.sender
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def slow_send(to_email, subject, body_html):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+
+    monkeypatch.setattr(sender, "EMAIL_PROVIDER", "smtp")
+    monkeypatch.setattr(sender, "send_email_smtp", slow_send)
+
+    async def two_batches():
+        batch = [(f"{i}@example.com", "s", "b") for i in range(6)]
+        return await asyncio.gather(sender.send_email_batch_async(batch), sender.send_email_batch_async(batch))
+
+    results = asyncio.run(two_batches())
+
+    assert results == [[None] * 6, [None] * 6]
+    assert state["peak"] == sender._SMTP_POOL_SIZE